@@ -1,17 +1,25 @@
+import time
 import asyncio
 import logging 
 import logging.config
 from database import db 
-from config import Config  
-from pyrogram import Client, __version__
+from config import Config, temp
+from pyrogram import Client, ContinuePropagation, __version__
 from pyrogram.raw.all import layer 
 from pyrogram.enums import ParseMode
-from pyrogram.errors import FloodWait 
+from pyrogram.handlers import RawUpdateHandler
+from plugins.regix import resume_jobs
+from plugins.broadcast import resume_broadcasts
+from plugins.test import POOL
+from plugins.ratelimit import limited
 
 logging.config.fileConfig('logging.conf')
 logging.getLogger().setLevel(logging.INFO)
 logging.getLogger("pyrogram").setLevel(logging.ERROR)
 
+# restart notices sent concurrently at startup
+NOTIFY_WORKERS = 10
+
 class Bot(Client): 
     def __init__(self):
         super().__init__(
@@ -27,6 +35,7 @@ class Bot(Client):
         self.log = logging
 
     async def start(self):
+        started = time.monotonic()
         await super().start()
         me = await self.get_me()
         logging.info(f"{me.first_name} with for pyrogram v{__version__} (Layer {layer}) started on @{me.username}.")
@@ -34,29 +43,74 @@ class Bot(Client):
         self.username = me.username
         self.first_name = me.first_name
         self.set_parse_mode(ParseMode.DEFAULT)
+        self.config_watcher = asyncio.create_task(db.watch_configs())
+        self.first_update = RawUpdateHandler(self.on_first_update)
+        self.add_handler(self.first_update, group=-1)
+        self.started_at = started
+        # notifications and resumes run in the background so updates are handled right away
+        self.startup = asyncio.create_task(self.after_start())
+        logging.info(f"Connected in {time.monotonic() - started:.1f}s")
+
+    async def on_first_update(self, client, update, users, chats):
+        if self.first_update:
+            handler, self.first_update = self.first_update, None
+            logging.info(f"First update handled {time.monotonic() - self.started_at:.1f}s after start")
+            self.remove_handler(handler, group=-1)
+        raise ContinuePropagation
+
+    async def after_start(self):
         text = "**๏[-ิ_•ิ]๏ bot restarted !**"
         logging.info(text)
-        success = failed = 0
-        users = await db.get_all_frwd()
-        async for user in users:
-           chat_id = user['user_id']
+        try:
            try:
-              await self.send_message(chat_id, text)
-              success += 1
-           except FloodWait as e:
-              await asyncio.sleep(e.value + 1)
-              await self.send_message(chat_id, text)
-              success += 1
-           except Exception:
-              failed += 1 
+              # read before any job can add to it, so only these users get the notice
+              interrupted = [doc async for doc in await db.get_all_frwd()]
+              resumed = await resume_jobs(self)
+           finally:
+              temp.RESUMING = False
+           if resumed:
+              logging.info(f"Resuming {resumed} checkpointed forwardings")
+           await self.notify_restart(text, interrupted)
+           broadcasts = await resume_broadcasts(self)
+           if broadcasts:
+              logging.info(f"Resuming {broadcasts} interrupted broadcasts")
+        except Exception as e:
+           logging.exception(f"Startup tasks failed: {e}")
+
+    async def notify_restart(self, text, interrupted):
+        """Tell the users whose forwarding was interrupted, several at a time under the rate limit"""
+        stats = {'success': 0, 'failed': 0}
+        queue = asyncio.Queue(maxsize=NOTIFY_WORKERS * 2)
+
+        async def worker():
+           while (chat_id := await queue.get()) is not None:
+              try:
+                 await limited(self, None, self.send_message, chat_id, text)
+                 stats['success'] += 1
+              except Exception:
+                 stats['failed'] += 1
+
+        workers = [asyncio.create_task(worker()) for _ in range(NOTIFY_WORKERS)]
+        try:
+           for user_id in dict.fromkeys(doc['user_id'] for doc in interrupted):
+              await queue.put(user_id)
+           for _ in workers:
+              await queue.put(None)
+           await asyncio.gather(*workers)
+        finally:
+           for task in workers:
+              task.cancel()
     #    await self.send_message("venombotsupport", text)
-        if (success + failed) != 0:
-           await db.rmve_frwd(all=True)
+        if (stats['success'] + stats['failed']) != 0:
+           # jobs started since then added their own documents; those stay
+           await db.rmve_frwd(ids=[doc['_id'] for doc in interrupted])
            logging.info(f"Restart message status"
-                 f"success: {success}"
-                 f"failed: {failed}")
+                 f"success: {stats['success']}"
+                 f"failed: {stats['failed']}")
 
     async def stop(self, *args):
         msg = f"@{self.username} stopped. Bye."
+        self.startup.cancel()
+        await POOL.close()
         await super().stop()
         logging.info(msg)
\ No newline at end of file
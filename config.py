@@ -18,6 +18,36 @@ class Config:
     
     # Session file path
     SESSION_PATH = config("SESSION_PATH", default="./sessions/")
+    
+    # Number of 200-message windows fetched ahead of the sender while forwarding
+    PREFETCH_WINDOWS = config("PREFETCH_WINDOWS", default=4, cast=int)
+    
+    # Seconds between progress checkpoints of a forwarding, used to resume it after a restart
+    CHECKPOINT_INTERVAL = config("CHECKPOINT_INTERVAL", default=30, cast=int)
+    
+    # Started bot / userbot clients kept warm between jobs, and seconds an idle one is kept
+    CLIENT_POOL_SIZE = config("CLIENT_POOL_SIZE", default=20, cast=int)
+    CLIENT_IDLE_TIMEOUT = config("CLIENT_IDLE_TIMEOUT", default=900, cast=int)
+    
+    # Seconds a pooled client may sit idle before it is pinged again on lease
+    CLIENT_HEALTH_INTERVAL = config("CLIENT_HEALTH_INTERVAL", default=120, cast=int)
+    
+    # Minimum seconds between two edits of a forwarding's progress message
+    PROGRESS_INTERVAL = config("PROGRESS_INTERVAL", default=10, cast=int)
+    
+    # User configs kept in memory, and seconds before a cached one is read again from MongoDB
+    CONFIG_CACHE_SIZE = config("CONFIG_CACHE_SIZE", default=1000, cast=int)
+    CONFIG_CACHE_TTL = config("CONFIG_CACHE_TTL", default=300, cast=int)
+    
+    # Chain forwarding: conversions awaiting a reply per converter bot, and seconds between submissions
+    CONVERTER_MAX_INFLIGHT = config("CONVERTER_MAX_INFLIGHT", default=3, cast=int)
+    CONVERTER_INTERVAL = config("CONVERTER_INTERVAL", default=2.0, cast=float)
+    
+    # Files /unequify remembers in memory before spilling its index to a temporary sqlite file
+    UNEQUIFY_MEMORY_KEYS = config("UNEQUIFY_MEMORY_KEYS", default=200000, cast=int)
+    
+    # Concurrent sends of /broadcast; the global rate limit still caps messages per second
+    BROADCAST_WORKERS = config("BROADCAST_WORKERS", default=20, cast=int)
 
 class temp(object): 
     lock = {}
@@ -25,6 +55,7 @@ class temp(object):
     forwardings = 0
     BANNED_USERS = []
     IS_FRWD_CHAT = []
+    RESUMING = True  # new forwardings wait until the interrupted ones are resumed at startup
     CHAIN_SETUP = {}
     USER_CLIENT = None  # Store user client globally
     CHAIN_CONFIGS = {}  # Store chain configurations
\ No newline at end of file
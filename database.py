@@ -1,7 +1,18 @@
+import copy
+import time
+import datetime
+import logging
+import collections
 from os import environ 
 from config import Config
 import motor.motor_asyncio
-from pymongo import MongoClient
+from pymongo import MongoClient, DeleteMany, UpdateMany
+from pymongo.errors import PyMongoError
+
+logger = logging.getLogger(__name__)
+
+# bot tokens before userbots (they get the higher rate limits and keep the user's account out of it), then oldest first
+BOT_ORDER = [('is_bot', -1), ('_id', 1)]
 
 async def mongodb_version():
     x = MongoClient(Config.DATABASE_URI)
@@ -17,6 +28,11 @@ class Database:
         self.col = self.db.users
         self.nfy = self.db.notify
         self.chl = self.db.channels 
+        self.jobs = self.db.jobs
+        self.chain_ops = self.db.chain_operations
+        self.broadcasts = self.db.broadcasts
+        # user id -> (expiry, configs), least recently used first
+        self.configs = collections.OrderedDict()
         
     def new_user(self, id, name):
         return dict(
@@ -72,8 +88,26 @@ class Database:
     async def get_all_users(self):
         return self.col.find({})
     
+    async def get_users_after(self, last_id=None):
+        """Users in `_id` order, starting after `last_id`"""
+        query = {'_id': {'$gt': last_id}} if last_id is not None else {}
+        return self.col.find(query, {'id': 1}, batch_size=1000).sort('_id', 1)
+    
+    async def cleanup_users(self, deleted=(), blocked=()):
+        """Remove deactivated accounts and flag users that blocked the bot, in one round-trip"""
+        requests = []
+        if deleted:
+            requests.append(DeleteMany({'id': {'$in': list(deleted)}}))
+        if blocked:
+            requests.append(UpdateMany({'id': {'$in': list(blocked)}}, {'$set': {'blocked': True}}))
+        if requests:
+            await self.col.bulk_write(requests, ordered=False)
+        for id in deleted:
+            self.configs.pop(id, None)
+    
     async def delete_user(self, user_id):
         await self.col.delete_many({'id': int(user_id)})
+        self.configs.pop(int(user_id), None)
  
     async def get_banned(self):
         users = self.col.find({'ban_status.is_banned': True})
@@ -82,6 +116,31 @@ class Database:
 
     async def update_configs(self, id, configs):
         await self.col.update_one({'id': int(id)}, {'$set': {'configs': configs}})
+        self.cache_configs(int(id), configs)
+    
+    def cache_configs(self, id, configs):
+        self.configs.pop(id, None)
+        self.configs[id] = (time.monotonic() + Config.CONFIG_CACHE_TTL, copy.deepcopy(configs))
+        while len(self.configs) > Config.CONFIG_CACHE_SIZE:
+            self.configs.popitem(last=False)
+    
+    async def watch_configs(self):
+        """Keep cached configs in step with changes from other processes; needs a replica set, else the TTL alone applies"""
+        pipeline = [{'$match': {'operationType': {'$in': ['update', 'replace', 'delete']}}}]
+        try:
+            async with self.col.watch(pipeline, full_document='updateLookup') as stream:
+                async for change in stream:
+                    user = change.get('fullDocument')
+                    if user and 'id' in user:
+                        # refresh rather than drop: this process's own writes come back here too
+                        if 'configs' in user and user['id'] in self.configs:
+                            self.cache_configs(user['id'], user['configs'])
+                        else:
+                            self.configs.pop(user['id'], None)
+                    else:
+                        self.configs.clear()
+        except PyMongoError as e:
+            logger.info(f"Config change stream unavailable, relying on cache TTL: {e}")
          
     async def get_configs(self, id):
         default = {
@@ -95,6 +154,7 @@ class Database:
             'protect': None,
             'button': None,
             'db_uri': None,
+            'ordered': False,
             'filters': {
                'poll': True,
                'text': True,
@@ -107,21 +167,38 @@ class Database:
                'sticker': True
             }
         }
-        user = await self.col.find_one({'id':int(id)})
-        if user:
-            return user.get('configs', default)
-        return default 
+        id = int(id)
+        cached = self.configs.get(id)
+        if cached and cached[0] > time.monotonic():
+            self.configs.move_to_end(id)
+            return copy.deepcopy(cached[1])
+        user = await self.col.find_one({'id': id}, {'configs': 1})
+        configs = user.get('configs', default) if user else default
+        self.cache_configs(id, configs)
+        return configs
        
     async def add_bot(self, datas):
-       if not await self.is_bot_exist(datas['user_id']):
+       if not await self.bot.find_one({'user_id': datas['user_id'], 'id': datas['id']}):
           await self.bot.insert_one(datas)
     
-    async def remove_bot(self, user_id):
-       await self.bot.delete_many({'user_id': int(user_id)})
+    async def remove_bot(self, user_id, bot_id=None):
+       query = {'user_id': int(user_id)}
+       if bot_id is not None:
+          query['id'] = int(bot_id)
+       await self.bot.delete_many(query)
       
-    async def get_bot(self, user_id: int):
-       bot = await self.bot.find_one({'user_id': user_id})
+    async def get_bot(self, user_id: int, bot_id=None, is_bot=None):
+       query = {'user_id': user_id}
+       if bot_id is not None:
+          query['id'] = int(bot_id)
+       if is_bot is not None:
+          query['is_bot'] = is_bot
+       bot = await self.bot.find_one(query, sort=BOT_ORDER)
        return bot if bot else None
+    
+    async def get_bots(self, user_id: int):
+       bots = self.bot.find({'user_id': user_id}).sort(BOT_ORDER)
+       return [bot async for bot in bots]
                                           
     async def is_bot_exist(self, user_id):
        bot = await self.bot.find_one({'user_id': user_id})
@@ -161,11 +238,47 @@ class Database:
     async def add_frwd(self, user_id):
        return await self.nfy.insert_one({'user_id': int(user_id)})
     
-    async def rmve_frwd(self, user_id=0, all=False):
-       data = {} if all else {'user_id': int(user_id)}
+    async def rmve_frwd(self, user_id=0, all=False, ids=None):
+       if ids is not None:
+          data = {'_id': {'$in': list(ids)}}
+       else:
+          data = {} if all else {'user_id': int(user_id)}
        return await self.nfy.delete_many(data)
     
     async def get_all_frwd(self):
        return self.nfy.find({})
+    
+    async def save_job(self, frwd_id, checkpoint):
+       await self.jobs.update_one({'_id': frwd_id}, {'$set': checkpoint}, upsert=True)
+    
+    async def remove_job(self, frwd_id):
+       await self.jobs.delete_many({'_id': frwd_id})
+    
+    async def get_jobs(self):
+       return self.jobs.find({})
+    
+    async def get_job(self, frwd_id):
+       return await self.jobs.find_one({'_id': frwd_id})
+    
+    async def add_broadcast(self, data):
+       return (await self.broadcasts.insert_one(data)).inserted_id
+    
+    async def save_broadcast(self, broadcast_id, data):
+       await self.broadcasts.update_one({'_id': broadcast_id}, {'$set': data})
+    
+    async def get_broadcasts(self, finished=None, limit=0):
+       query = {} if finished is None else {'finished': finished}
+       return self.broadcasts.find(query).sort('_id', -1).limit(limit)
+    
+    async def save_chain_op(self, key, operation):
+       await self.chain_ops.replace_one({'_id': key}, operation, upsert=True)
+    
+    async def remove_chain_op(self, key):
+       await self.chain_ops.delete_many({'_id': key})
+    
+    async def get_chain_ops(self):
+       # mongo drops documents once `expires_at` passes (checked about once a minute)
+       await self.chain_ops.create_index('expires_at', expireAfterSeconds=0)
+       return self.chain_ops.find({'expires_at': {'$gt': datetime.datetime.utcnow()}})
      
 db = Database(Config.DATABASE_URI, Config.DATABASE_NAME)
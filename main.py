@@ -87,8 +87,10 @@ async def main():
             "[cyan]Chain Forwarding:[/cyan]\n"
             "• /chain - Setup automated forwarding\n"
             "• /chainlist - View configurations\n"
+            "• /chaindomains - Set link domains\n"
             "• /chainon - Enable chain forwarding\n"
-            "• /chainoff - Disable chain forwarding\n\n"
+            "• /chainoff - Disable chain forwarding\n"
+            "• /chaindel - Delete a chain\n\n"
             "[cyan]Channel Management:[/cyan]\n"
             "• /join <link> - Join channel/group\n"
             "• /leave <chat> - Leave channel/group\n"
@@ -1,57 +1,152 @@
-import asyncio 
-import time, datetime 
-from database import db 
+import asyncio
+import logging
+import time, datetime
+from database import db
 from config import Config
-from pyrogram import Client, filters 
-from pyrogram.errors import InputUserDeactivated, FloodWait, UserIsBlocked
+from pyrogram import Client, filters
+from pyrogram.errors import InputUserDeactivated, UserIsBlocked
+from .ratelimit import limited
+from .sequencer import Sequencer
+from .utils import ProgressReporter
+
+logger = logging.getLogger(__name__)
+
+BROADCAST_TEXT = "Broadcast in progress:\n\nTotal Users {}\nCompleted: {} / {}\nSuccess: {}\nBlocked: {}\nDeleted: {}"
+# users confirmed between two broadcast checkpoints
+CHECKPOINT_USERS = 100
+# deactivated / blocked users collected before they are cleaned up in one bulk write
+CLEANUP_BATCH = 100
 
 @Client.on_message(filters.command("broadcast") & filters.user(Config.BOT_OWNER_ID) & filters.reply)
 async def broadcast (bot, message):
-    users = await db.get_all_users()
     b_msg = message.reply_to_message
     sts = await message.reply_text(
         text='Broadcasting your messages...'
     )
-    start_time = time.time()
     total_users, k = await db.total_users_bots_count()
-    done = 0
-    blocked = 0
-    deleted = 0
-    failed = 0 
-    success = 0
-    async for user in users:
-        pti, sh = await broadcast_messages(int(user['id']), b_msg, bot.log)
-        if pti:
-            success += 1
-            await asyncio.sleep(2)
-        elif pti == False:
-            if sh == "Blocked":
-                blocked+=1
-            elif sh == "Deleted":
-                deleted += 1
-            elif sh == "Error":
-                failed += 1
-        done += 1
-        if not done % 20:
-            await sts.edit(f"Broadcast in progress:\n\nTotal Users {total_users}\nCompleted: {done} / {total_users}\nSuccess: {success}\nBlocked: {blocked}\nDeleted: {deleted}")    
-    time_taken = datetime.timedelta(seconds=int(time.time()-start_time))
-    await sts.edit(f"Broadcast Completed:\nCompleted in {time_taken} seconds.\n\nTotal Users {total_users}\nCompleted: {done} / {total_users}\nSuccess: {success}\nBlocked: {blocked}\nDeleted: {deleted}")
-
-async def broadcast_messages(user_id, message, log):
+    job = {
+        'from_chat_id': b_msg.chat.id,
+        'message_id': b_msg.id,
+        'last_id': None,
+        'total': total_users,
+        'stats': {'done': 0, 'Success': 0, 'Blocked': 0, 'Deleted': 0, 'Error': 0},
+        'started': time.time(),
+        'finished': False
+    }
+    job['_id'] = await db.add_broadcast(job)
+    await run_broadcast(bot, job, b_msg, sts)
+
+async def run_broadcast(bot, job, b_msg, sts):
+    """Send `b_msg` to every user after `job['last_id']`, checkpointing the job as users are confirmed"""
+    stats, total_users = job['stats'], job['total']
+    progress = ProgressReporter(sts, lambda sleeping: (
+        BROADCAST_TEXT.format(total_users, stats['done'], total_users, stats['Success'], stats['Blocked'], stats['Deleted'])
+        + (f"\n\nSleeping {sleeping} s" if sleeping else ""), None))
+    queue = asyncio.Queue(maxsize=Config.BROADCAST_WORKERS * 2)
+    # users are numbered in cursor order; the tracker confirms the prefix that is fully sent
+    tracker, pending = Sequencer(1), {}
+    # counters of the users up to `last_id`, which is all a checkpoint may claim;
+    # `results` holds the outcome of users sent past it until they are confirmed
+    confirmed, results = dict(stats), {}
+    saved = 0
+    gone = {'Deleted': [], 'Blocked': []}
+
+    async def cleanup():
+        deleted, blocked = gone['Deleted'], gone['Blocked']
+        gone['Deleted'], gone['Blocked'] = [], []
+        await db.cleanup_users(deleted, blocked)
+
+    async def checkpoint():
+        nonlocal saved
+        upto = tracker.next - 1
+        if upto in pending:
+            job['last_id'] = pending[upto]
+        for n in [n for n in pending if n <= upto]:
+            del pending[n]
+        for n in [n for n in results if n <= upto]:
+            confirmed[results.pop(n)] += 1
+            confirmed['done'] += 1
+        saved = upto
+        await db.save_broadcast(job['_id'], {'last_id': job['last_id'], 'stats': confirmed})
+
+    async def worker():
+        # every worker shares the bot-wide rate limit, which adapts to FloodWaits
+        while (item := await queue.get()) is not None:
+            n, user_id = item
+            pti, sh = await broadcast_messages(bot, user_id, b_msg, bot.log, progress.flood)
+            stats[sh] += 1
+            stats['done'] += 1
+            results[n] = sh
+            if sh in gone:
+                gone[sh].append(user_id)
+                if len(gone['Deleted']) + len(gone['Blocked']) >= CLEANUP_BATCH:
+                    await cleanup()
+            await tracker.release(n)
+            progress.update()
+            if tracker.next - 1 - saved >= CHECKPOINT_USERS:
+                await checkpoint()
+
+    workers = [asyncio.create_task(worker()) for _ in range(max(1, Config.BROADCAST_WORKERS))]
+    progress.start()
+    try:
+        n = 0
+        async for user in await db.get_users_after(job['last_id']):
+            n += 1
+            pending[n] = user['_id']
+            await queue.put((n, int(user['id'])))
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+    finally:
+        for task in workers:
+            task.cancel()
+        await progress.stop()
+    await cleanup()
+    await checkpoint()
+    await db.save_broadcast(job['_id'], {'finished': True})
+    time_taken = datetime.timedelta(seconds=int(time.time()-job['started']))
+    await sts.edit(f"Broadcast Completed:\nCompleted in {time_taken} seconds.\n\nTotal Users {total_users}\nCompleted: {stats['done']} / {total_users}\nSuccess: {stats['Success']}\nBlocked: {stats['Blocked']}\nDeleted: {stats['Deleted']}")
+
+async def resume_broadcasts(bot):
+    """Continue the broadcasts that were interrupted by a restart"""
+    jobs = [job async for job in await db.get_broadcasts(finished=False)]
+    for job in jobs:
+        try:
+            b_msg = await bot.get_messages(job['from_chat_id'], job['message_id'])
+            if b_msg.empty:
+                raise ValueError("broadcast message was deleted")
+            sts = await bot.send_message(job['from_chat_id'], f"Resuming broadcast after {job['stats']['done']} users...")
+        except Exception as e:
+            logger.warning(f"Could not resume broadcast {job['_id']}: {e}")
+            await db.save_broadcast(job['_id'], {'finished': True, 'error': str(e)})
+            continue
+        logger.info(f"Resuming broadcast {job['_id']} after {job['stats']['done']} users")
+        asyncio.create_task(run_broadcast(bot, job, b_msg, sts))
+    return len(jobs)
+
+@Client.on_message(filters.command("broadcasts") & filters.user(Config.BOT_OWNER_ID))
+async def broadcast_status(bot, message):
+    jobs = [job async for job in await db.get_broadcasts(limit=5)]
+    if not jobs:
+        return await message.reply_text("No broadcasts yet.")
+    text = "Recent broadcasts:\n"
+    for job in jobs:
+        stats = job['stats']
+        started = datetime.datetime.fromtimestamp(job['started']).strftime('%Y-%m-%d %H:%M')
+        status = "Completed" if job['finished'] and not job.get('error') else job.get('error') or "In progress"
+        text += f"\n{started} - {status}\nCompleted: {stats['done']} / {job['total']}\nSuccess: {stats['Success']}\nBlocked: {stats['Blocked']}\nDeleted: {stats['Deleted']}\n"
+    await message.reply_text(text)
+
+async def broadcast_messages(bot, user_id, message, log, on_flood=None):
     try:
-        await message.copy(chat_id=user_id)
+        await limited(bot, None, message.copy, chat_id=user_id, on_flood=on_flood)
         return True, "Success"
-    except FloodWait as e:
-        await asyncio.sleep(e.x)
-        return await broadcast_messages(user_id, message, log)
     except InputUserDeactivated:
-        await db.delete_user(int(user_id))
-        log.info(f"{user_id}-Removed from Database, since deleted account.")
+        # removed from the database by the caller, in batches
+        log.info(f"{user_id}-Removing from Database, since deleted account.")
         return False, "Deleted"
     except UserIsBlocked:
         log.info(f"{user_id} -Blocked the bot.")
         return False, "Blocked"
     except Exception as e:
         return False, "Error"
-
-    
@@ -1,7 +1,9 @@
 import asyncio
 import re
+import heapq
 import logging
 import time
+import datetime
 from database import db
 from config import Config, temp
 from translation import Translation
@@ -9,12 +11,78 @@ from pyrogram import Client, filters
 from pyrogram.types import InlineKeyboardButton, InlineKeyboardMarkup, Message
 from pyrogram.errors import FloodWait
 from rich.console import Console
+from .ratelimit import limited
+from .links import DEFAULT_DOMAINS, extract_links, normalize_domains
 
 console = Console()
 logger = logging.getLogger(__name__)
 
-# Store pending chain operations
+# Pending chain operations keyed by (converter bot username, forwarded message id)
 CHAIN_OPERATIONS = {}
+# (deadline, key) heap drained by a single expiry task
+CHAIN_EXPIRY = []
+CHAIN_TIMEOUT = 300
+# both made by add_operation inside the running loop; on Python 3.8 an Event made at import binds to another loop
+expiry_wakeup = None
+expiry_task = None
+# converter bot username -> ConverterQueue
+CONVERTER_QUEUES = {}
+
+class ConverterQueue:
+    """Paces the posts submitted to one converter bot.
+
+    Posts wait in a FIFO until fewer than `Config.CONVERTER_MAX_INFLIGHT` of its
+    conversions are outstanding and `Config.CONVERTER_INTERVAL` seconds passed since
+    the previous submission; a conversion stays outstanding until the reply arrives
+    or the operation expires."""
+
+    def __init__(self, converter_bot):
+        self.converter_bot = converter_bot
+        self.queue = asyncio.Queue()
+        self.outstanding = 0
+        self.slot = asyncio.Condition()
+        self.submitted = 0
+        self.wait_time = 0.0
+        self.last_wait = 0.0
+        self.worker = None
+
+    def put(self, bot, message, config, links):
+        self.queue.put_nowait((time.monotonic(), bot, message, config, links))
+        if not self.worker or self.worker.done():
+            self.worker = asyncio.create_task(self.run())
+
+    async def acquire(self):
+        async with self.slot:
+            await self.slot.wait_for(lambda: self.outstanding < max(1, Config.CONVERTER_MAX_INFLIGHT))
+            self.outstanding += 1
+
+    async def release(self):
+        async with self.slot:
+            self.outstanding = max(0, self.outstanding - 1)
+            self.slot.notify()
+
+    async def run(self):
+        last_submit = 0
+        while True:
+            queued_at, bot, message, config, links = await self.queue.get()
+            await self.acquire()
+            await asyncio.sleep(max(0, last_submit + Config.CONVERTER_INTERVAL - time.monotonic()))
+            last_submit = time.monotonic()
+            self.last_wait = last_submit - queued_at
+            self.wait_time = self.last_wait if not self.submitted else 0.8 * self.wait_time + 0.2 * self.last_wait
+            self.submitted += 1
+            if not await process_chain_forward(bot, message, config, links):
+                await self.release()
+
+    @property
+    def depth(self):
+        return self.queue.qsize()
+
+def converter_queue(converter_bot):
+    name = converter_bot.lower()
+    if name not in CONVERTER_QUEUES:
+        CONVERTER_QUEUES[name] = ConverterQueue(name)
+    return CONVERTER_QUEUES[name]
 
 @Client.on_message(filters.private & filters.command(["chain", "chainforward"]))
 async def setup_chain_forward(bot, message):
@@ -56,59 +124,77 @@ async def setup_chain_forward(bot, message):
     
     converter_bot = converter_msg.text.strip().replace('@', '')
     
-    # Step 3: Select target channel
+    # Step 3: Select target channels
     if len(channels) > 1:
-        buttons = []
-        btn_data = {}
-        for channel in channels:
-            buttons.append([InlineKeyboardButton(f"{channel['title']}", callback_data=f"chain_target_{channel['chat_id']}")])
-            btn_data[channel['chat_id']] = channel['title']
-        
-        buttons.append([InlineKeyboardButton("Cancel", callback_data="chain_cancel")])
-        
-        await message.reply(
-            "<b>❪ CHOOSE TARGET CHANNEL ❫</b>\n\nSelect where to post the final converted links:",
-            reply_markup=InlineKeyboardMarkup(buttons)
-        )
-        
-        # Store temporary data
-        temp.CHAIN_SETUP = temp.CHAIN_SETUP if hasattr(temp, 'CHAIN_SETUP') else {}
         temp.CHAIN_SETUP[user_id] = {
             'source_chat_id': source_chat_id,
             'source_title': source_title,
             'converter_bot': converter_bot,
-            'channels': btn_data
+            'channels': {channel['chat_id']: channel['title'] for channel in channels},
+            'selected': []
         }
+        await message.reply(
+            "<b>❪ CHOOSE TARGET CHANNELS ❫</b>\n\nSelect where to post the final converted links, then press Done:",
+            reply_markup=target_buttons(temp.CHAIN_SETUP[user_id])
+        )
     else:
-        target_chat_id = channels[0]['chat_id']
-        target_title = channels[0]['title']
+        targets = [{'chat_id': channels[0]['chat_id'], 'title': channels[0]['title']}]
         
         # Save chain configuration
-        await save_chain_config(user_id, source_chat_id, source_title, converter_bot, target_chat_id, target_title)
-        
-        await message.reply(
-            f"<b>✅ Chain Forward Setup Complete!</b>\n\n"
-            f"<b>Source:</b> {source_title}\n"
-            f"<b>Converter:</b> @{converter_bot}\n"
-            f"<b>Target:</b> {target_title}\n\n"
-            f"The bot will now automatically:\n"
-            f"1. Monitor {source_title} for new posts\n"
-            f"2. Forward posts with links to @{converter_bot}\n"
-            f"3. Wait for converted links\n"
-            f"4. Post final result to {target_title}"
-        )
+        await save_chain_config(user_id, source_chat_id, source_title, converter_bot, targets)
+        await message.reply(setup_complete_text(source_title, converter_bot, targets))
+
+def target_buttons(setup_data):
+    buttons = []
+    for chat_id, title in setup_data['channels'].items():
+        mark = "✅ " if chat_id in setup_data['selected'] else ""
+        buttons.append([InlineKeyboardButton(f"{mark}{title}", callback_data=f"chain_target_{chat_id}")])
+    buttons.append([InlineKeyboardButton("Cancel", callback_data="chain_cancel"),
+                    InlineKeyboardButton("Done", callback_data="chain_done")])
+    return InlineKeyboardMarkup(buttons)
+
+def setup_complete_text(source_title, converter_bot, targets):
+    titles = ", ".join(target['title'] for target in targets)
+    return (
+        f"<b>✅ Chain Forward Setup Complete!</b>\n\n"
+        f"<b>Source:</b> {source_title}\n"
+        f"<b>Converter:</b> @{converter_bot}\n"
+        f"<b>Targets:</b> {titles}\n\n"
+        f"The bot will now automatically:\n"
+        f"1. Monitor {source_title} for new posts\n"
+        f"2. Forward posts with links to @{converter_bot}\n"
+        f"3. Wait for converted links\n"
+        f"4. Post final result to {titles}"
+    )
 
 @Client.on_callback_query(filters.regex(r'^chain_target_'))
 async def handle_target_selection(bot, query):
-    """Handle target channel selection"""
+    """Toggle a target channel of the chain being set up"""
     user_id = query.from_user.id
     target_chat_id = int(query.data.split('_')[2])
     
-    if not hasattr(temp, 'CHAIN_SETUP') or user_id not in temp.CHAIN_SETUP:
+    if user_id not in temp.CHAIN_SETUP:
+        return await query.answer("Setup expired. Please start again.", show_alert=True)
+    
+    selected = temp.CHAIN_SETUP[user_id]['selected']
+    if target_chat_id in selected:
+        selected.remove(target_chat_id)
+    else:
+        selected.append(target_chat_id)
+    await query.message.edit_reply_markup(target_buttons(temp.CHAIN_SETUP[user_id]))
+
+@Client.on_callback_query(filters.regex(r'^chain_done$'))
+async def handle_target_done(bot, query):
+    """Save the chain with the selected target channels"""
+    user_id = query.from_user.id
+    
+    if user_id not in temp.CHAIN_SETUP:
         return await query.answer("Setup expired. Please start again.", show_alert=True)
     
     setup_data = temp.CHAIN_SETUP[user_id]
-    target_title = setup_data['channels'][target_chat_id]
+    if not setup_data['selected']:
+        return await query.answer("Select at least one target channel.", show_alert=True)
+    targets = [{'chat_id': chat_id, 'title': setup_data['channels'][chat_id]} for chat_id in setup_data['selected']]
     
     # Save chain configuration
     await save_chain_config(
@@ -116,21 +202,10 @@ async def handle_target_selection(bot, query):
         setup_data['source_chat_id'],
         setup_data['source_title'],
         setup_data['converter_bot'],
-        target_chat_id,
-        target_title
+        targets
     )
     
-    await query.message.edit_text(
-        f"<b>✅ Chain Forward Setup Complete!</b>\n\n"
-        f"<b>Source:</b> {setup_data['source_title']}\n"
-        f"<b>Converter:</b> @{setup_data['converter_bot']}\n"
-        f"<b>Target:</b> {target_title}\n\n"
-        f"The bot will now automatically:\n"
-        f"1. Monitor {setup_data['source_title']} for new posts\n"
-        f"2. Forward posts with links to @{setup_data['converter_bot']}\n"
-        f"3. Wait for converted links\n"
-        f"4. Post final result to {target_title}"
-    )
+    await query.message.edit_text(setup_complete_text(setup_data['source_title'], setup_data['converter_bot'], targets))
     
     # Clean up temporary data
     del temp.CHAIN_SETUP[user_id]
@@ -139,29 +214,56 @@ async def handle_target_selection(bot, query):
 async def handle_chain_cancel(bot, query):
     """Handle chain setup cancellation"""
     user_id = query.from_user.id
-    if hasattr(temp, 'CHAIN_SETUP') and user_id in temp.CHAIN_SETUP:
-        del temp.CHAIN_SETUP[user_id]
+    temp.CHAIN_SETUP.pop(user_id, None)
     
     await query.message.edit_text("Chain forward setup cancelled.")
 
-async def save_chain_config(user_id, source_chat_id, source_title, converter_bot, target_chat_id, target_title):
-    """Save chain forwarding configuration to database"""
+async def save_chain_config(user_id, source_chat_id, source_title, converter_bot, targets):
+    """Save a chain to the database; a user has one chain per source chat"""
     chain_config = {
         'user_id': user_id,
         'source_chat_id': source_chat_id,
         'source_title': source_title,
         'converter_bot': converter_bot,
-        'target_chat_id': target_chat_id,
-        'target_title': target_title,
+        'targets': targets,
         'active': True
     }
     
-    # Add to database (you might need to create a new collection for this)
-    await db.db.chain_configs.replace_one(
-        {'user_id': user_id},
-        chain_config,
+    # $set keeps fields configured separately, like the link domains
+    await db.db.chain_configs.update_one(
+        {'user_id': user_id, 'source_chat_id': source_chat_id},
+        {'$set': chain_config, '$unset': {'target_chat_id': '', 'target_title': ''}},
         upsert=True
     )
+    await refresh_chain_index(user_id)
+
+def chain_targets(config):
+    """Target chats of a chain, including chains saved before multiple targets"""
+    if config.get('targets'):
+        return config['targets']
+    return [{'chat_id': config['target_chat_id'], 'title': config['target_title']}]
+
+async def get_user_chains(user_id):
+    return [config async for config in db.db.chain_configs.find({'user_id': user_id}).sort('_id', 1)]
+
+async def load_chain_index():
+    """Build `temp.CHAIN_CONFIGS`, the active chain configurations keyed by source chat id"""
+    index = {}
+    async for config in db.db.chain_configs.find({'active': True}):
+        index.setdefault(config['source_chat_id'], []).append(config)
+    temp.CHAIN_CONFIGS = index
+    return sum(len(configs) for configs in index.values())
+
+async def refresh_chain_index(user_id):
+    """Re-read the chain configurations of one user into `temp.CHAIN_CONFIGS`"""
+    for source_chat_id in list(temp.CHAIN_CONFIGS):
+        configs = [c for c in temp.CHAIN_CONFIGS[source_chat_id] if c['user_id'] != user_id]
+        if configs:
+            temp.CHAIN_CONFIGS[source_chat_id] = configs
+        else:
+            del temp.CHAIN_CONFIGS[source_chat_id]
+    async for config in db.db.chain_configs.find({'user_id': user_id, 'active': True}):
+        temp.CHAIN_CONFIGS.setdefault(config['source_chat_id'], []).append(config)
 
 @Client.on_message(filters.channel)
 async def monitor_source_channels(bot, message):
@@ -171,66 +273,37 @@ async def monitor_source_channels(bot, message):
         if not temp.USER_CLIENT or bot != temp.USER_CLIENT:
             return
             
-        # Get all active chain configurations
-        chain_configs = await db.db.chain_configs.find({'active': True}).to_list(None)
+        # Active chain configurations watching this chat
+        chain_configs = temp.CHAIN_CONFIGS.get(message.chat.id)
+        if not chain_configs or not (message.text or message.caption):
+            return
         
         for config in chain_configs:
-            if message.chat.id == config['source_chat_id']:
-                # Check if message contains links
-                if has_convertible_links(message):
-                    await process_chain_forward(bot, message, config)
+            links = extract_links(message, config.get('domains'))
+            if links:
+                converter_queue(config['converter_bot']).put(bot, message, config, links)
                     
     except Exception as e:
         logger.error(f"Error in monitor_source_channels: {e}")
 
-def has_convertible_links(message):
-    """Check if message contains convertible links (TeraBox, etc.)"""
-    if not message.text and not message.caption:
-        return False
-    
-    text = message.text or message.caption
-    
-    # Common file sharing domains that might need conversion
-    convertible_domains = [
-        'terabox.com',
-        'teraboxapp.com', 
-        '1024tera.com',
-        'nephobox.com',
-        'freeterabox.com',
-        'terabox.app',
-        'teraboxlink.com',
-        'mirrobox.com',
-        'momerybox.com',
-        'teraboxs.com',
-        'tibibox.com',
-        '4funbox.co',
-        'terasharelink.com'
-    ]
-    
-    # Check for any convertible links
-    for domain in convertible_domains:
-        if domain in text.lower():
-            return True
-    
-    return False
-
-async def process_chain_forward(bot, original_message, config):
-    """Process the chain forwarding operation"""
+async def process_chain_forward(bot, original_message, config, links):
+    """Process the chain forwarding operation for the extracted `links`; True once it waits for a reply"""
     try:
         user_id = config['user_id']
         converter_bot = config['converter_bot']
-        target_chat_id = config['target_chat_id']
+        targets = [target['chat_id'] for target in chain_targets(config)]
         
         # Use the userbot client
         if not temp.USER_CLIENT:
             logger.error(f"Userbot not available for user {user_id}")
-            return
+            return False
         
         user_client = temp.USER_CLIENT
         
         # Step 1: Forward original message to converter bot
         console.print(f"[cyan]🔄 Forwarding message to @{converter_bot}[/cyan]")
-        forwarded_msg = await user_client.forward_messages(
+        forwarded_msg = await limited(
+            user_client, converter_bot, user_client.forward_messages,
             chat_id=converter_bot,
             from_chat_id=original_message.chat.id,
             message_ids=original_message.id
@@ -238,23 +311,29 @@ async def process_chain_forward(bot, original_message, config):
         
         # Step 2: Wait for converter bot reply
         operation_id = f"{user_id}_{original_message.id}_{forwarded_msg.id}"
-        CHAIN_OPERATIONS[operation_id] = {
-            'user_client': user_client,
-            'original_message': original_message,
-            'target_chat_id': target_chat_id,
+        key = operation_key(converter_bot, forwarded_msg.id)
+        operation = {
+            'operation_id': operation_id,
+            'source_chat_id': original_message.chat.id,
+            'source_msg_id': original_message.id,
+            'targets': targets,
             'converter_bot': converter_bot,
             'forwarded_msg_id': forwarded_msg.id,
+            'links': links,
             'timestamp': time.time(),
+            'expires_at': datetime.datetime.utcnow() + datetime.timedelta(seconds=CHAIN_TIMEOUT),
             'user_id': user_id
         }
-        
-        # Set up timeout (5 minutes)
-        asyncio.create_task(cleanup_operation(operation_id, 300))
+        add_operation(key, operation)
+        # persisted so a restart before the converter replies doesn't drop it
+        await db.save_chain_op(operation_store_id(key), {k: v for k, v in operation.items() if k != 'deadline'})
         
         console.print(f"[green]✅ Chain operation started: {operation_id}[/green]")
+        return True
         
     except Exception as e:
         console.print(f"[red]❌ Error in process_chain_forward: {e}[/red]")
+        return False
 
 @Client.on_message(filters.private)
 async def handle_converter_replies(bot, message):
@@ -264,87 +343,183 @@ async def handle_converter_replies(bot, message):
         if not temp.USER_CLIENT or bot != temp.USER_CLIENT:
             return
             
-        if not message.reply_to_message:
+        if not message.reply_to_message or not message.chat.username:
             return
         
         # Find matching chain operation
-        for operation_id, operation in CHAIN_OPERATIONS.items():
-            if (message.chat.username == operation['converter_bot'] and 
-                message.reply_to_message.id == operation['forwarded_msg_id']):
-                
-                console.print(f"[cyan]📤 Posting converted result to target channel[/cyan]")
-                
-                # Step 3: Forward the converted reply to target channel
-                await operation['user_client'].copy_message(
-                    chat_id=operation['target_chat_id'],
-                    from_chat_id=message.chat.id,
-                    message_id=message.id
-                )
-                
-                console.print(f"[green]✅ Chain operation completed: {operation_id}[/green]")
-                
-                # Clean up (don't stop the client, just remove from operations)
-                del CHAIN_OPERATIONS[operation_id]
-                break
+        operation = CHAIN_OPERATIONS.pop(operation_key(message.chat.username, message.reply_to_message.id), None)
+        if not operation:
+            return
+        await converter_queue(operation['converter_bot']).release()
+        
+        targets = operation.get('targets') or [operation['target_chat_id']]
+        console.print(f"[cyan]📤 Posting converted result to {len(targets)} target channel(s)[/cyan]")
+        
+        # Step 3: Copy the converted reply to every target at once
+        user_client = temp.USER_CLIENT
+        results = await asyncio.gather(*(
+            limited(
+                user_client, target, user_client.copy_message,
+                chat_id=target,
+                from_chat_id=message.chat.id,
+                message_id=message.id
+            ) for target in targets), return_exceptions=True)
+        for target, result in zip(targets, results):
+            if isinstance(result, Exception):
+                console.print(f"[red]❌ Could not post to {target}: {result}[/red]")
+        
+        await db.remove_chain_op(operation_store_id(operation_key(operation['converter_bot'], operation['forwarded_msg_id'])))
+        console.print(f"[green]✅ Chain operation completed: {operation['operation_id']}[/green]")
                 
     except Exception as e:
         console.print(f"[red]❌ Error in handle_converter_replies: {e}[/red]")
 
-async def cleanup_operation(operation_id, timeout):
-    """Clean up chain operation after timeout"""
-    await asyncio.sleep(timeout)
-    
-    if operation_id in CHAIN_OPERATIONS:
-        del CHAIN_OPERATIONS[operation_id]
-        console.print(f"[yellow]⏰ Chain operation timed out: {operation_id}[/yellow]")
+def operation_key(converter_bot, message_id):
+    return converter_bot.lower(), message_id
+
+def operation_store_id(key):
+    return f"{key[0]}:{key[1]}"
+
+async def load_chain_operations():
+    """Reload the chain operations still waiting for a converter reply, e.g. after a restart"""
+    count = 0
+    now = datetime.datetime.utcnow()
+    async for operation in await db.get_chain_ops():
+        operation.pop('_id', None)
+        remaining = (operation['expires_at'] - now).total_seconds()
+        add_operation(operation_key(operation['converter_bot'], operation['forwarded_msg_id']), operation, remaining)
+        converter_queue(operation['converter_bot']).outstanding += 1
+        count += 1
+    return count
+
+def add_operation(key, operation, timeout=CHAIN_TIMEOUT):
+    """Register a pending chain operation and schedule its expiry"""
+    global expiry_task, expiry_wakeup
+    deadline = time.monotonic() + timeout
+    operation['deadline'] = deadline
+    CHAIN_OPERATIONS[key] = operation
+    earliest = not CHAIN_EXPIRY or deadline < CHAIN_EXPIRY[0][0]
+    heapq.heappush(CHAIN_EXPIRY, (deadline, key))
+    if not expiry_task or expiry_task.done():
+        expiry_wakeup = asyncio.Event()
+        expiry_task = asyncio.create_task(expire_operations())
+    elif earliest:
+        expiry_wakeup.set()
+
+async def expire_operations():
+    """Drop chain operations whose converter never replied, sleeping until the nearest deadline"""
+    while True:
+        expiry_wakeup.clear()
+        timeout = CHAIN_EXPIRY[0][0] - time.monotonic() if CHAIN_EXPIRY else None
+        if timeout is None or timeout > 0:
+            try:
+                await asyncio.wait_for(expiry_wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            continue
+        deadline, key = heapq.heappop(CHAIN_EXPIRY)
+        operation = CHAIN_OPERATIONS.get(key)
+        # entries of completed or re-registered operations are skipped lazily
+        if operation and operation['deadline'] == deadline:
+            del CHAIN_OPERATIONS[key]
+            await converter_queue(operation['converter_bot']).release()
+            console.print(f"[yellow]⏰ Chain operation timed out: {operation['operation_id']}[/yellow]")
 
 @Client.on_message(filters.private & filters.command(["chainlist"]))
 async def list_chain_configs(bot, message):
-    """List active chain configurations"""
+    """List the chain configurations of the user"""
     user_id = message.from_user.id
     
-    config = await db.db.chain_configs.find_one({'user_id': user_id})
+    chains = await get_user_chains(user_id)
     
-    if not config:
+    if not chains:
         return await message.reply("No chain forwarding configured. Use /chain to set up.")
     
-    status = "✅ Active" if config['active'] else "❌ Inactive"
+    text = "<b>🔗 Chain Forward Configurations</b>\n"
+    for n, config in enumerate(chains, 1):
+        status = "✅ Active" if config['active'] else "❌ Inactive"
+        domains = "default" if not config.get('domains') else ", ".join(config['domains'])
+        queue = converter_queue(config['converter_bot'])
+        text += (
+            f"\n<b>{n}. {config['source_title']}</b> — {status}\n"
+            f"<b>Converter:</b> @{config['converter_bot']}\n"
+            f"<b>Targets:</b> {', '.join(target['title'] for target in chain_targets(config))}\n"
+            f"<b>Link domains:</b> {domains}\n"
+            f"<b>Converter queue:</b> {queue.depth} waiting, {queue.outstanding} converting, avg wait {queue.wait_time:.0f}s\n"
+        )
+    text += "\nUse /chainoff, /chainon, /chaindomains or /chaindel with a chain number (all chains without one), or /chain to add one."
+    await message.reply(text)
+
+async def select_chains(message):
+    """Chains chosen by the leading chain number of a command, all of the user's chains without one"""
+    user_id = message.from_user.id
+    chains = await get_user_chains(user_id)
+    args = message.command[1:]
+    if args and args[0].isdigit():
+        n = int(args.pop(0))
+        chains = chains[n - 1:n] if n > 0 else []
+    return chains, args
+
+@Client.on_message(filters.private & filters.command(["chaindomains"]))
+async def set_chain_domains(bot, message):
+    """Set the link domains that trigger chain forwarding"""
+    user_id = message.from_user.id
+    
+    chains, args = await select_chains(message)
+    if not chains:
+        return await message.reply("No chain forwarding found. Use /chain to set up or /chainlist to see the chain numbers.")
+    
+    if not args:
+        domains = chains[0].get('domains') or DEFAULT_DOMAINS
+        return await message.reply(
+            f"<b>🔗 Link domains of {chains[0]['source_title']}:</b>\n<code>{' '.join(domains)}</code>\n\n"
+            f"<b>Usage:</b> <code>/chaindomains [chain number] terabox.com 1024tera.com</code>\n"
+            f"<code>/chaindomains [chain number] default</code> - use the built-in list"
+        )
     
-    await message.reply(
-        f"<b>🔗 Chain Forward Configuration</b>\n\n"
-        f"<b>Status:</b> {status}\n"
-        f"<b>Source:</b> {config['source_title']}\n"
-        f"<b>Converter:</b> @{config['converter_bot']}\n"
-        f"<b>Target:</b> {config['target_title']}\n\n"
-        f"Use /chainoff to disable or /chain to reconfigure."
+    domains = None if args == ['default'] else list(normalize_domains(args))
+    await db.db.chain_configs.update_many({'_id': {'$in': [c['_id'] for c in chains]}}, {'$set': {'domains': domains}})
+    await refresh_chain_index(user_id)
+    await message.reply(f"✅ Link domains of {len(chains)} chain(s) updated: {'default' if not domains else ', '.join(domains)}")
+
+async def set_chains_active(message, active):
+    chains, args = await select_chains(message)
+    result = await db.db.chain_configs.update_many(
+        {'_id': {'$in': [c['_id'] for c in chains]}},
+        {'$set': {'active': active}}
     )
+    await refresh_chain_index(message.from_user.id)
+    return chains, result.modified_count
 
 @Client.on_message(filters.private & filters.command(["chainoff"]))
 async def disable_chain_forward(bot, message):
     """Disable chain forwarding"""
-    user_id = message.from_user.id
-    
-    result = await db.db.chain_configs.update_one(
-        {'user_id': user_id},
-        {'$set': {'active': False}}
-    )
+    chains, modified = await set_chains_active(message, False)
     
-    if result.modified_count > 0:
-        await message.reply("✅ Chain forwarding disabled.")
+    if modified > 0:
+        await message.reply(f"✅ Chain forwarding disabled for {modified} chain(s).")
     else:
         await message.reply("No active chain forwarding found.")
 
 @Client.on_message(filters.private & filters.command(["chainon"]))
 async def enable_chain_forward(bot, message):
     """Enable chain forwarding"""
-    user_id = message.from_user.id
-    
-    result = await db.db.chain_configs.update_one(
-        {'user_id': user_id},
-        {'$set': {'active': True}}
-    )
+    chains, modified = await set_chains_active(message, True)
     
-    if result.modified_count > 0:
-        await message.reply("✅ Chain forwarding enabled.")
+    if modified > 0:
+        await message.reply(f"✅ Chain forwarding enabled for {modified} chain(s).")
+    elif chains:
+        await message.reply("Chain forwarding is already enabled.")
     else:
-        await message.reply("No chain forwarding configuration found. Use /chain to set up.")
\ No newline at end of file
+        await message.reply("No chain forwarding configuration found. Use /chain to set up.")
+
+@Client.on_message(filters.private & filters.command(["chaindel"]))
+async def delete_chain_forward(bot, message):
+    """Delete one chain, selected by its /chainlist number"""
+    chains, args = await select_chains(message)
+    if not message.command[1:] or not message.command[1].isdigit() or not chains:
+        return await message.reply("<b>Usage:</b> <code>/chaindel [chain number]</code> - see /chainlist")
+    
+    await db.db.chain_configs.delete_many({'_id': chains[0]['_id']})
+    await refresh_chain_index(message.from_user.id)
+    await message.reply(f"✅ Chain from {chains[0]['source_title']} deleted.")
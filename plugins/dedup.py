@@ -0,0 +1,246 @@
+import os
+import math
+import sqlite3
+import hashlib
+import logging
+import tempfile
+import motor.motor_asyncio
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from database import db
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+FLUSH_SIZE = 500
+# one client per user database uri, shared by every job writing to it
+CLIENTS = {}
+
+class BloomFilter:
+    """Fixed size bloom filter over string keys"""
+
+    def __init__(self, capacity, error_rate=0.001):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], 'big'), int.from_bytes(digest[8:], 'big')
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, key):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+def message_key(message):
+    """`file_unique_id` for media, a normalized text hash for text posts, None otherwise"""
+    if message.media:
+        media = getattr(message, message.media.value, None)
+        unique_id = getattr(media, 'file_unique_id', None)
+        if unique_id:
+            return unique_id
+    text = message.text or message.caption
+    if text:
+        normalized = " ".join(str(text).lower().split())
+        return "text:" + hashlib.sha1(normalized.encode()).hexdigest()
+    return None
+
+def user_database(uri):
+    if uri not in CLIENTS:
+        CLIENTS[uri] = motor.motor_asyncio.AsyncIOMotorClient(uri)
+    return CLIENTS[uri][Config.DATABASE_NAME]
+
+class DuplicateIndex:
+    """Persistent per-target-chat index of forwarded files and texts.
+
+    Stored in the user's own database (`db_uri`) when set, else in the main one.
+    The keys of the target are loaded into a bloom filter at job start so only
+    possible hits cost a round-trip. `check` claims new keys in memory only;
+    they are persisted in batches once `record` confirms their delivery."""
+
+    def __init__(self, uri, chat_id):
+        database = user_database(uri) if uri else db.db
+        self.col = database.duplicates
+        self.chat_id = int(chat_id)
+        self.bloom = None
+        self.position = 0
+        self.added = set()
+        self.buffer = []
+
+    async def load(self):
+        await self.col.create_index([('chat_id', 1), ('key', 1)], unique=True)
+        count = await self.col.count_documents({'chat_id': self.chat_id})
+        self.bloom = BloomFilter(max(count * 2, 100000))
+        async for doc in self.col.find({'chat_id': self.chat_id, 'key': {'$exists': True}}, {'key': 1, '_id': 0}):
+            self.bloom.add(doc['key'])
+        return self
+
+    async def seed(self, client, last_id, cancelled=None, progress=None):
+        """Index the target's existing history up to `last_id`, resuming from the previous seed.
+
+        `position` is the last id read, for `progress`; once `cancelled()` is true the
+        scan stops and keeps what it indexed, so the next seed continues from there."""
+        meta = await self.col.find_one({'chat_id': self.chat_id, 'seeded': {'$exists': True}})
+        start = meta['seeded'] + 1 if meta else 1
+        self.position = start - 1
+        if start >= last_id:
+            return 0
+        seeded = 0
+        async for message in client.iter_messages(client, chat_id=self.chat_id, limit=last_id, offset=start):
+            if cancelled and cancelled():
+                break
+            self.position = message.id
+            if progress:
+                progress.update()
+            if message.empty or message.service:
+                continue
+            key = message_key(message)
+            if key and key not in self.added:
+                self.add(key)
+                await self.record(key)
+                seeded += 1
+        await self.flush()
+        await self.advance(self.position)
+        logger.info(f"Seeded duplicate index of {self.chat_id} with {seeded} keys up to {self.position}")
+        return seeded
+
+    async def advance(self, last_id):
+        """Move the seed watermark up to `last_id`; the next seed starts after it"""
+        await self.col.update_one({'chat_id': self.chat_id, 'seeded': {'$exists': True}},
+                                  {'$max': {'seeded': last_id}}, upsert=True)
+
+    def add(self, key):
+        self.bloom.add(key)
+        self.added.add(key)
+
+    async def record(self, *keys):
+        """Persist keys whose messages reached the target"""
+        self.buffer.extend({'chat_id': self.chat_id, 'key': key} for key in keys if key)
+        if len(self.buffer) >= FLUSH_SIZE:
+            await self.flush()
+
+    async def check(self, keys):
+        """Flag which of `keys` were already forwarded, recording the new ones"""
+        lookup = list({key for key in keys if key in self.bloom and key not in self.added})
+        known = set()
+        if lookup:
+            async for doc in self.col.find({'chat_id': self.chat_id, 'key': {'$in': lookup}}, {'key': 1, '_id': 0}):
+                known.add(doc['key'])
+        flags = []
+        for key in keys:
+            duplicate = key in known or key in self.added
+            if not duplicate:
+                self.add(key)
+            flags.append(duplicate)
+        return flags
+
+    async def flush(self):
+        if not self.buffer:
+            return
+        buffer, self.buffer = self.buffer, []
+        try:
+            await self.col.insert_many(buffer, ordered=False)
+        except BulkWriteError:
+            pass
+
+class SeenIndex:
+    """Map of file keys to the message id kept for them during one scan.
+
+    Entries live in a dict until `limit` of them are held, then all of them move
+    to a temporary on-disk primary-key table so memory stays bounded on huge channels."""
+
+    def __init__(self, limit=None):
+        self.limit = Config.UNEQUIFY_MEMORY_KEYS if limit is None else limit
+        self.keys = {}
+        self.path = None
+        self.conn = None
+
+    def get(self, key):
+        if self.conn is None:
+            return self.keys.get(key)
+        row = self.conn.execute("SELECT id FROM seen WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def put(self, key, id):
+        if self.conn is None:
+            self.keys[key] = id
+            if len(self.keys) > self.limit:
+                self.spill()
+        else:
+            self.conn.execute("INSERT OR REPLACE INTO seen VALUES (?, ?)", (key, id))
+
+    def spill(self):
+        fd, self.path = tempfile.mkstemp(prefix='unequify-', suffix='.db')
+        os.close(fd)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute("PRAGMA journal_mode=OFF")
+        self.conn.execute("PRAGMA synchronous=OFF")
+        self.conn.execute("CREATE TABLE seen (key TEXT PRIMARY KEY, id INTEGER) WITHOUT ROWID")
+        self.conn.executemany("INSERT INTO seen VALUES (?, ?)", self.keys.items())
+        self.keys = {}
+        logger.info(f"Duplicate scan spilled to {self.path}")
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+class ChatFileIndex:
+    """Persistent index of the files of one chat for /unequify.
+
+    Maps each `file_unique_id` to the oldest message id kept for it and stores the
+    highest message id scanned, so a later run only reads newer messages and looks
+    their keys up here in batches. `seen` holds what the current run touched."""
+
+    def __init__(self, chat_id):
+        self.col = db.db.unequify
+        self.chat_id = chat_id
+        self.seen = SeenIndex()
+        self.scanned = 0
+        self.buffer = {}
+
+    async def load(self):
+        await self.col.create_index([('chat_id', 1), ('key', 1)], unique=True)
+        meta = await self.col.find_one({'chat_id': self.chat_id, 'scanned': {'$exists': True}})
+        self.scanned = meta['scanned'] if meta else 0
+        return self
+
+    async def lookup(self, keys):
+        """Stored message id of each of `keys` indexed by earlier runs"""
+        if not self.scanned or not keys:
+            return {}
+        cursor = self.col.find({'chat_id': self.chat_id, 'key': {'$in': list(keys)}}, {'key': 1, 'id': 1, '_id': 0})
+        return {doc['key']: doc['id'] async for doc in cursor}
+
+    async def keep(self, key, id):
+        self.seen.put(key, id)
+        self.buffer[key] = id
+        if len(self.buffer) >= FLUSH_SIZE:
+            await self.flush()
+
+    async def flush(self):
+        if not self.buffer:
+            return
+        buffer, self.buffer = self.buffer, {}
+        await self.col.bulk_write([UpdateOne({'chat_id': self.chat_id, 'key': key}, {'$set': {'id': id}}, upsert=True)
+                                   for key, id in buffer.items()], ordered=False)
+
+    async def save(self, scanned):
+        """Flush the kept files and move the watermark up to `scanned`"""
+        await self.flush()
+        if scanned > self.scanned:
+            await self.col.update_one({'chat_id': self.chat_id, 'scanned': {'$exists': True}},
+                                      {'$set': {'scanned': scanned}}, upsert=True)
+            self.scanned = scanned
+
+    def close(self):
+        self.seen.close()
@@ -0,0 +1,95 @@
+import re
+import functools
+from urllib.parse import urlsplit, urlunsplit
+from pyrogram.enums import MessageEntityType
+
+# File sharing hosts whose links converter bots usually handle
+DEFAULT_DOMAINS = (
+    'terabox.com',
+    'teraboxapp.com',
+    '1024tera.com',
+    'nephobox.com',
+    'freeterabox.com',
+    'terabox.app',
+    'teraboxlink.com',
+    'mirrobox.com',
+    'momerybox.com',
+    'teraboxs.com',
+    'tibibox.com',
+    '4funbox.co',
+    'terasharelink.com'
+)
+
+TRAILING = '.,;:!?)]}>"\''
+# bare or schemed links in text without entities; hosts are checked afterwards
+URL_REGEX = re.compile(r"(?<![\w@.-])(?:https?://)?(?:[\w-]+\.)+[a-z]{2,}(?::\d+)?(?:[/?#]\S*)?", re.IGNORECASE)
+
+def normalize_domains(domains):
+    """Lowercased, de-duplicated host list; None or empty means `DEFAULT_DOMAINS`"""
+    domains = [d.strip().lower().lstrip('.') for d in (domains or []) if d and d.strip()]
+    domains = [re.sub(r'^(https?://)?(www\.)?', '', d).split('/')[0] for d in domains]
+    return tuple(sorted(set(d for d in domains if d))) or DEFAULT_DOMAINS
+
+class LinkMatcher:
+    """Extracts the links of a message that point at one of `domains`.
+
+    URLs come from the message entities (`url` and hidden `text_link`), falling
+    back to one scan of the raw text with `URL_REGEX` when the message carries no
+    entities. Hosts match a domain or any of its subdomains."""
+
+    def __init__(self, domains):
+        hosts = "|".join(map(re.escape, sorted(domains, key=len, reverse=True)))
+        self.host = re.compile(rf"(?:^|\.)(?:{hosts})$")
+
+    def extract(self, message):
+        """Normalized matching URLs of `message`, in order of appearance and without repeats"""
+        text = message.text or message.caption
+        entities = message.entities or message.caption_entities
+        if entities:
+            candidates = urls_from_entities(str(text or ''), entities)
+        elif text:
+            candidates = (match.group(0) for match in URL_REGEX.finditer(str(text)))
+        else:
+            return []
+        links = {}
+        for url in candidates:
+            url = normalize_url(url)
+            if url and self.host.search(urlsplit(url).hostname or ''):
+                links.setdefault(url, None)
+        return list(links)
+
+@functools.lru_cache(maxsize=256)
+def get_matcher(domains):
+    return LinkMatcher(domains)
+
+def extract_links(message, domains=None):
+    """Convertible links of `message` for the given (chain config) domains"""
+    return get_matcher(normalize_domains(domains)).extract(message)
+
+def urls_from_entities(text, entities):
+    # entity offsets count UTF-16 code units
+    encoded = None
+    for entity in entities:
+        if entity.type == MessageEntityType.TEXT_LINK and entity.url:
+            yield entity.url
+        elif entity.type == MessageEntityType.URL:
+            if encoded is None:
+                encoded = text.encode('utf-16-le')
+            yield encoded[entity.offset * 2:(entity.offset + entity.length) * 2].decode('utf-16-le', 'ignore')
+
+def normalize_url(url):
+    url = url.strip().rstrip(TRAILING)
+    if not re.match(r'^[a-z][a-z0-9+.-]*://', url, re.IGNORECASE):
+        url = 'https://' + url
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return None
+    if not parts.hostname:
+        return None
+    scheme = 'https' if parts.scheme.lower() in ('http', 'https') else parts.scheme.lower()
+    host = parts.hostname.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    netloc = f"{host}:{parts.port}" if parts.port else host
+    return urlunsplit((scheme, netloc, parts.path or '/', parts.query, ''))
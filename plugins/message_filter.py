@@ -0,0 +1,78 @@
+import re
+from pyrogram.enums import MessageMediaType
+from .dedup import message_key
+
+MB = 1024 * 1024
+
+class Skipped(str):
+    """Sentinel yielded in place of a message that must not be forwarded.
+
+    Compares equal to "FILTERED" / "DUPLICATE" so callers can keep checking
+    `message == "FILTERED"`, while still carrying the original message id."""
+
+    def __new__(cls, reason, id):
+        obj = super().__new__(cls, reason)
+        obj.id = id
+        return obj
+
+class MessageFilter:
+    """Per-job message predicate compiled once from the data built by `STS.get_data`"""
+
+    def __init__(self, data, duplicate=None):
+        self.duplicate = duplicate
+        self.types = frozenset(data.get('filters') or ())
+        keywords = sorted({k for k in (data.get('keywords') or []) if k}, key=len, reverse=True)
+        self.keywords = re.compile("|".join(map(re.escape, keywords)), re.IGNORECASE) if keywords else None
+        self.extensions = frozenset(e.lower().lstrip('.') for e in (data.get('extensions') or []) if e)
+        size = data.get('media_size')
+        self.size = (int(size[0]), size[1]) if size else None
+
+    async def __call__(self, messages):
+        """Filter one fetched window, marking already forwarded messages as duplicates"""
+        messages = [self.check(message) for message in messages]
+        if self.duplicate:
+            keyed = [(i, message_key(m)) for i, m in enumerate(messages)
+                     if not isinstance(m, Skipped) and not m.empty and not m.service]
+            keyed = [(i, key) for i, key in keyed if key]
+            flags = await self.duplicate.check([key for i, key in keyed])
+            for (i, key), duplicate in zip(keyed, flags):
+                if duplicate:
+                    messages[i] = Skipped("DUPLICATE", messages[i].id)
+        return messages
+
+    def check(self, message):
+        if message.empty or message.service:
+            return message
+        if not self.allowed(message):
+            return Skipped("FILTERED", message.id)
+        return message
+
+    def allowed(self, message):
+        kind = message_type(message)
+        if kind in self.types:
+            return False
+        media = getattr(message, message.media.value, None) if message.media else None
+        file_name = getattr(media, 'file_name', None) or ''
+        if self.extensions and file_name and file_name.rsplit('.', 1)[-1].lower() in self.extensions:
+            return False
+        if self.size and media is not None and getattr(media, 'file_size', None):
+            if not size_allowed(media.file_size, *self.size):
+                return False
+        # keywords apply to file names only; messages without one pass
+        if self.keywords and file_name and not self.keywords.search(file_name):
+            return False
+        return True
+
+def message_type(message):
+    """Name of the filter key (see `Database.get_configs`) covering this message"""
+    if not message.media or message.media == MessageMediaType.WEB_PAGE:
+        return 'text'
+    return message.media.value
+
+def size_allowed(file_size, limit, mode):
+    # mode True: more than `limit` MB, False: less than, None: exactly `limit` MB
+    if mode is True:
+        return file_size > limit * MB
+    elif mode is False:
+        return file_size < limit * MB
+    return int(file_size / MB) == limit
@@ -0,0 +1,86 @@
+import time
+import asyncio
+import logging
+from pyrogram.errors import FloodWait
+
+logger = logging.getLogger(__name__)
+
+# requests per second: starting rate, floor, ceiling, additive increase per success
+PROFILES = {
+    'bot': {'rate': 1.0, 'min_rate': 0.05, 'max_rate': 30.0, 'step': 0.05},
+    'user': {'rate': 0.2, 'min_rate': 0.02, 'max_rate': 3.0, 'step': 0.01},
+    'bot_global': {'rate': 25.0, 'min_rate': 1.0, 'max_rate': 30.0, 'step': 0.1},
+    'user_global': {'rate': 3.0, 'min_rate': 0.1, 'max_rate': 10.0, 'step': 0.02},
+}
+
+BUCKETS = {}
+
+class TokenBucket:
+    """Token bucket whose rate grows while calls succeed and halves on FloodWait"""
+
+    def __init__(self, rate, min_rate, max_rate, step):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.step = step
+        self.tokens = 1.0
+        self.updated = time.monotonic()
+        self.paused_until = 0
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self.tokens = min(max(1.0, self.rate), self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def success(self):
+        self.rate = min(self.max_rate, self.rate + self.step)
+
+    def flood(self, seconds):
+        self.rate = max(self.min_rate, self.rate / 2)
+        self.tokens = 0
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+def get_buckets(client, chat_id):
+    """Shared (client-wide, client+chat) buckets, profiled by bot token vs user session.
+
+    With `chat_id` None only the client-wide bucket applies, for one-off sends to
+    many chats (broadcasts) that would otherwise leave a bucket per chat behind."""
+    me = getattr(client, 'me', None)
+    client_id = me.id if me else id(client)
+    kind = 'bot' if getattr(me, 'is_bot', True) else 'user'
+    keys = ((client_id, None, kind + '_global'),) + (((client_id, chat_id, kind),) if chat_id is not None else ())
+    buckets = []
+    for key in keys:
+        if key not in BUCKETS:
+            BUCKETS[key] = TokenBucket(**PROFILES[key[2]])
+        buckets.append(BUCKETS[key])
+    return buckets
+
+async def limited(client, chat, func, /, *args, on_flood=None, **kwargs):
+    """Await `func(*args, **kwargs)` under the rate limit of (client, chat), retrying on FloodWait"""
+    buckets = get_buckets(client, chat)
+    while True:
+        for bucket in buckets:
+            await bucket.acquire()
+        try:
+            result = await func(*args, **kwargs)
+        except FloodWait as e:
+            logger.info(f"FloodWait of {e.value}s on {chat}, slowing down to {buckets[-1].rate / 2:.2f}/s")
+            for bucket in buckets:
+                bucket.flood(e.value)
+            if on_flood:
+                await on_flood(e.value)
+            continue
+        for bucket in buckets:
+            bucket.success()
+        return result
@@ -4,26 +4,36 @@ import math
 import time
 import asyncio 
 import logging
-from .utils import STS
+import collections
+from .utils import STS, ProgressReporter
+from .message_filter import MessageFilter
+from .dedup import DuplicateIndex, message_key
+from .ratelimit import limited
+from .sequencer import Sequencer, plan_shards, merge_ranges
 from database import db 
-from .test import CLIENT , start_clone_bot
+from .test import POOL
 from config import Config, temp
 from translation import Translation
-from pyrogram import Client, filters 
+from pyrogram import Client, filters, raw
 #from pyropatch.utils import unpack_new_file_id
 from pyrogram.errors import FloodWait, MessageNotModified, RPCError
 from pyrogram.types import InlineKeyboardButton, InlineKeyboardMarkup, CallbackQuery, Message 
+from pyrogram.types import InputMediaPhoto, InputMediaVideo, InputMediaAudio, InputMediaDocument
 
-CLIENT = CLIENT()
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 TEXT = Translation.TEXT
+SHARD_CHUNK = 50
+CANCEL_BTN = InlineKeyboardMarkup([[InlineKeyboardButton('• ᴄᴀɴᴄᴇʟ', 'terminate_frwd')]])
+ALBUM_TYPES = {'photo': InputMediaPhoto, 'video': InputMediaVideo, 'audio': InputMediaAudio, 'document': InputMediaDocument}
 
 @Client.on_callback_query(filters.regex(r'^start_public'))
 async def pub_(bot, message):
     user = message.from_user.id
     temp.CANCEL[user] = False
     frwd_id = message.data.split("_")[2]
+    if temp.RESUMING:
+      return await message.answer("bot just restarted and is resuming forwardings. please try again in a moment", show_alert=True)
     if temp.lock.get(user) and str(temp.lock.get(user))=="True":
       return await message.answer("please wait until previous task complete", show_alert=True)
     sts = STS(frwd_id)
@@ -34,123 +44,440 @@ async def pub_(bot, message):
     if i.TO in temp.IS_FRWD_CHAT:
       return await message.answer("In Target chat a task is progressing. please wait until task complete", show_alert=True)
     m = await msg_edit(message.message, "<code>verifying your data's, please wait.</code>")
+    # a retry continues from the checkpoint the job left behind, if there is one
+    await run_forwarding(user, frwd_id, m, await db.get_job(frwd_id))
+
+async def run_forwarding(user, frwd_id, m, checkpoint=None):
+    """Verify the clients and run the forwarding stored in `STS(frwd_id)`, optionally from a checkpoint"""
+    sts = STS(frwd_id)
+    i = sts.get(full=True)
+    # held from the start so no second job begins while this one verifies or seeds
+    temp.lock[user] = True
+    temp.IS_FRWD_CHAT.append(i.TO)
     _bot, caption, forward_tag, data, protect, button = await sts.get_data(user)
     if not _bot:
+      unlock(user, sts)
       return await msg_edit(m, "<code>You didn't added any bot. Please add a bot using /settings !</code>", wait=True)
-    try:
-      client = await start_clone_bot(CLIENT.client(_bot))
-    except Exception as e:  
-      return await m.edit(e)
     await msg_edit(m, "<code>processing..</code>")
-    try: 
-       await client.get_messages(sts.get("FROM"), sts.get("limit"))
-    except:
-       await msg_edit(m, f"**Source chat may be a private channel / group. Use userbot (user must be member over there) or  if Make Your [Bot](t.me/{_bot['username']}) an admin over there**", retry_btn(frwd_id), True)
-       return await stop(client, user)
-    try:
-       k = await client.send_message(i.TO, "Testing")
-       await k.delete()
-    except:
-       await msg_edit(m, f"**Please Make Your [UserBot / Bot](t.me/{_bot['username']}) Admin In Target Channel With Full Permissions**", retry_btn(frwd_id), True)
-       return await stop(client, user)
+    # the first bot in `db.get_bots` order that passes the checks leads the job, so a
+    # bot that can't read a private source falls back to the user's userbot
+    client = failure = None
+    for _bot in await db.get_bots(user):
+       try:
+         client = await POOL.lease(_bot)
+       except Exception as e:
+         failure = failure or f"<b>BOT ERROR:</b> <code>{e}</code>"
+         client = None
+         continue
+       k, reason = await preflight(client, _bot, sts)
+       if not reason:
+          break
+       failure = failure or reason
+       await POOL.release(client)
+       client = None
+    if not client:
+       unlock(user, sts)
+       return await msg_edit(m, failure, retry_btn(frwd_id), True)
+    duplicate = None
+    if data['skip_duplicate']:
+       # the job isn't counted in `temp.forwardings` yet, so these exits don't go through `stop`
+       try:
+          duplicate = await seed_duplicates(client, user, data, k.id, m)
+       except Exception as e:
+          await msg_edit(m, f"<b>DUPLICATE INDEX ERROR:</b>\n<code>{e}</code>", retry_btn(frwd_id), True)
+          unlock(user, sts)
+          return await POOL.release(client)
+       if temp.CANCEL.get(user) == True:
+          await db.remove_job(frwd_id)
+          unlock(user, sts)
+          await POOL.release(client)
+          return await msg_edit(m, "<b>❌ Forwarding Process Cancelled</b>", wait=True)
+    start = int(sts.get('skip')) if sts.get('skip') else 0
+    delivered = set()
+    if checkpoint:
+       start = checkpoint['confirmed'] + 1
+       delivered = {id for first, last in checkpoint['delivered'] for id in range(max(first, start), last + 1)}
+       sts.set('fetched', start + len(delivered))
+    # no more clients than there are chunks to hand out
+    chunks = math.ceil((int(sts.get('limit')) - start + 1) / SHARD_CHUNK)
+    clients = [client] + await start_extra_clients(user, _bot, sts, chunks - 1)
     temp.forwardings += 1
     await db.add_frwd(user)
     await send(client, user, "<b>ғᴏʀᴡᴀʀᴅɪɴɢ sᴛᴀʀᴛᴇᴅ <a href=https://t.me/dev_gagan>Dev Gagan</a></b>")
     sts.add(time=True)
-    sleep = 1 if _bot['is_bot'] else 10
     await msg_edit(m, "<code>Processing...</code>") 
-    temp.IS_FRWD_CHAT.append(i.TO)
     temp.lock[user] = locked = True
     if locked:
+        ordered = data['ordered'] and len(clients) > 1
+        shards = plan_shards(start, int(sts.get('limit')), len(clients), SHARD_CHUNK if ordered else None)
+        # a client whose shard came out empty goes back to the pool instead of running
+        await stop_clients([c for c, ranges in zip(clients[1:], shards[1:]) if not ranges])
+        work = [(c, ranges) for c, ranges in zip(clients, shards) if ranges]
+        clients = [client] + [c for c, ranges in work if c is not client]
+        progress = ProgressReporter(m, lambda sleeping: progress_text('Progressing', sleeping or 10, sts))
+        job = {'sts': sts, 'progress': progress, 'user': user, 'forward_tag': forward_tag, 'caption': caption, 'button': button,
+               'protect': protect, 'predicate': MessageFilter(data, duplicate), 'duplicate': duplicate, 'ordered': ordered,
+               'tracker': Sequencer(start, delivered), 'delivered': delivered, 'pending': {}, 'last_sent': 0}
+        await save_checkpoint(job)
+        saver = asyncio.create_task(checkpointer(job))
+        progress.start()
         try:
-          MSG = []
-          pling=0
-          await edit(m, 'Progressing', 10, sts)
-          print(f"Starting Forwarding Process... From :{sts.get('FROM')} To: {sts.get('TO')} Totel: {sts.get('limit')} stats : {sts.get('skip')})")
-          async for message in client.iter_messages(
-            client,
-            chat_id=sts.get('FROM'), 
-            limit=int(sts.get('limit')), 
-            offset=int(sts.get('skip')) if sts.get('skip') else 0
-            ):
-                if await is_cancelled(client, user, m, sts):
-                   return
-                if pling %20 == 0: 
-                   await edit(m, 'Progressing', 10, sts)
-                pling += 1
-                sts.add('fetched')
-                if message == "DUPLICATE":
-                   sts.add('duplicate')
-                   continue 
-                elif message == "FILTERED":
-                   sts.add('filtered')
-                   continue 
-                if message.empty or message.service:
-                   sts.add('deleted')
-                   continue
-                if forward_tag:
-                   MSG.append(message.id)
-                   notcompleted = len(MSG)
-                   completed = sts.get('total') - sts.get('fetched')
-                   if ( notcompleted >= 100 
-                        or completed <= 100): 
-                      await forward(client, MSG, m, sts, protect)
-                      sts.add('total_files', notcompleted)
-                      await asyncio.sleep(10)
-                      MSG = []
-                else:
-                   new_caption = custom_caption(message, caption)
-                   details = {"msg_id": message.id, "media": media(message), "caption": new_caption, 'button': button, "protect": protect}
-                   await copy(client, details, m, sts)
-                   sts.add('total_files')
-                   await asyncio.sleep(sleep) 
+          print(f"Starting Forwarding Process... From :{sts.get('FROM')} To: {sts.get('TO')} Totel: {sts.get('limit')} stats : {start} bots: {len(clients)})")
+          await run_shards([run_shard(c, ranges, job) for c, ranges in work])
         except Exception as e:
-            await msg_edit(m, f'<b>ERROR:</b>\n<code>{e}</code>', wait=True)
+            # the checkpoint stays for the retry button
+            saver.cancel()
+            try:
+               await save_checkpoint(job)
+            except Exception as error:
+               logger.warning(f"Checkpoint of {frwd_id} failed: {error}")
+            await msg_edit(m, f'<b>ERROR:</b>\n<code>{e}</code>', retry_btn(frwd_id), wait=True)
             temp.IS_FRWD_CHAT.remove(sts.TO)
+            await stop_clients(clients[1:])
             return await stop(client, user)
+        finally:
+            saver.cancel()
+            await progress.stop()
+            if duplicate:
+               await duplicate.flush()
+        await stop_clients(clients[1:])
+        if await is_cancelled(client, user, m, sts):
+           return
+        if duplicate and job['last_sent']:
+           # the next seed starts after what this job sent; its keys are recorded already
+           await duplicate.advance(job['last_sent'])
+        await db.remove_job(frwd_id)
         temp.IS_FRWD_CHAT.remove(sts.TO)
         await send(client, user, "<b>🎉 ғᴏʀᴡᴀᴅɪɴɢ ᴄᴏᴍᴘʟᴇᴛᴇᴅ 🥀 <a href=https://t.me/dev_gagan>SUPPORT</a>🥀</b>")
         await edit(m, 'Completed', "completed", sts) 
         await stop(client, user)
+
+async def seed_duplicates(client, user, data, last_id, m):
+    """Open the target's duplicate index and index its history first, with progress and a cancel button"""
+    index = DuplicateIndex(*data['skip_duplicate'])
+    progress = ProgressReporter(m, lambda sleeping: (
+        f"<code>indexing target chat for duplicates.. {index.position} / {last_id}</code>", CANCEL_BTN))
+    progress.start()
+    try:
+       await index.load()
+       await index.seed(client, last_id, lambda: temp.CANCEL.get(user) == True, progress)
+    finally:
+       await progress.stop()
+    return index
+
+async def save_checkpoint(job):
+    """Store the progress of a forwarding so it can resume after a restart"""
+    sts, tracker = job['sts'], job['tracker']
+    if job['duplicate']:
+       # keys of delivered messages are persisted before the checkpoint counts them
+       await job['duplicate'].flush()
+    await db.save_job(sts.id, {
+        'user_id': job['user'],
+        'status': dict(sts.data[sts.id]),
+        'confirmed': tracker.next - 1,
+        # ranges, not ids: contiguous shards finish far ahead of `confirmed`
+        'delivered': merge_ranges(tracker.released),
+        'pending': [id for ids in job['pending'].values() for id in ids]
+    })
+
+async def checkpointer(job):
+    while True:
+        await asyncio.sleep(Config.CHECKPOINT_INTERVAL)
+        try:
+           await save_checkpoint(job)
+        except Exception as e:
+           logger.warning(f"Checkpoint of {job['sts'].id} failed: {e}")
+
+async def resume_jobs(bot):
+    """Resume the forwardings that were checkpointed when the bot went down.
+
+    A job whose user or target is busy keeps its checkpoint and the user gets a
+    retry button for it instead; the checkpoint is only removed once a job
+    completes or is cancelled."""
+    jobs = [job async for job in await db.get_jobs()]
+    users, targets = set(), set()
+    for job in jobs:
+        user, frwd_id, status = job['user_id'], job['_id'], job['status']
+        sts = STS(frwd_id).store(status['FROM'], status['TO'], status['skip'], status['limit'])
+        for key in ['total_files', 'filtered', 'deleted', 'duplicate']:
+           sts.set(key, status.get(key, 0))
+        busy = (temp.lock.get(user) == True or status['TO'] in temp.IS_FRWD_CHAT
+                or user in users or status['TO'] in targets)
+        try:
+           if busy:
+              await bot.send_message(user, f"<code>your forwarding stopped at message {job['confirmed']} and can't resume while another task runs. press retry once it is done.</code>", reply_markup=retry_btn(frwd_id))
+              continue
+           temp.CANCEL[user] = False
+           m = await bot.send_message(user, f"<code>resuming your forwarding from message {job['confirmed'] + 1}..</code>")
+        except Exception as e:
+           logger.warning(f"Could not resume forwarding {frwd_id}: {e}")
+           continue
+        users.add(user)
+        targets.add(status['TO'])
+        logger.info(f"Resuming forwarding {frwd_id} of {user} from {job['confirmed'] + 1}")
+        asyncio.create_task(run_forwarding(user, frwd_id, m, job))
+    return len(users)
+
+async def preflight(client, _bot, sts):
+    """Check `client` can read the source and post in the target: (test message, None) or (None, reason)"""
+    try: 
+       await client.get_messages(sts.get("FROM"), sts.get("limit"))
+    except:
+       return None, f"**Source chat may be a private channel / group. Use userbot (user must be member over there) or  if Make Your [Bot](t.me/{_bot['username']}) an admin over there**"
+    try:
+       k = await client.send_message(sts.get('TO'), "Testing")
+       await k.delete()
+    except:
+       return None, f"**Please Make Your [UserBot / Bot](t.me/{_bot['username']}) Admin In Target Channel With Full Permissions**"
+    return k, None
+
+async def start_extra_clients(user, _bot, sts, limit):
+    """Start up to `limit` of the user's other bots / userbots that can read the source and post in the target"""
+    clients = []
+    for extra in await db.get_bots(user):
+        if len(clients) >= limit:
+           break
+        if extra['id'] == _bot['id']:
+           continue
+        try:
+           extra_client = await POOL.lease(extra)
+        except Exception as e:
+           logger.warning(f"Skipping {extra['name']} for forwarding: {e}")
+           continue
+        k, reason = await preflight(extra_client, extra, sts)
+        if reason:
+           logger.warning(f"Skipping {extra['name']} for forwarding: it can't read the source or post in the target")
+           await stop_clients([extra_client])
+           continue
+        clients.append(extra_client)
+    return clients
+
+async def stop_clients(clients):
+    for client in clients:
+        await POOL.release(client)
+
+async def run_shards(coros):
+    """Run the shards of a forwarding, cancelling the rest as soon as one fails"""
+    tasks = [asyncio.create_task(coro) for coro in coros]
+    done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+    for task in done:
+        if task.exception():
+           raise task.exception()
+
+async def run_shard(client, ranges, job):
+    """Fetch and send the id ranges of one shard of a forwarding.
+
+    Messages are sent in batches of 100 (`forward` with forward tag, else `copy_batch`),
+    except those whose caption or buttons must be rewritten, which are copied one by
+    one. Albums arrive grouped from the fetch stage and go out whole, in one batch or
+    one `send_media_group`. A shard keeps one send in flight at a time, so the
+    target gets its messages in source order, FloodWait retries included; the fetch
+    runs ahead and the next send is prepared while the previous one is on the wire.
+    `inflight` retires a finished send so counters and checkpoints only move over
+    finished ids.
+    With ordered sharding a shard waits at each new chunk until all lower ids are done."""
+    sts, progress, tracker = job['sts'], job['progress'], job['tracker']
+    inflight = collections.deque()
+
+    async def delivered(*messages):
+        if job['duplicate']:
+           await job['duplicate'].record(*map(message_key, messages))
+        await tracker.release(*(message.id for message in messages))
+
+    async def retire(keep):
+        while len(inflight) > keep or (inflight and inflight[0][1].done()):
+            messages, task = inflight.popleft()
+            sent = await task
+            sts.add('total_files', len(sent))
+            await delivered(*sent)
+            # `delivered` released the sent ids; the failed ones are done as well
+            failed = {message.id for message in messages} - {message.id for message in sent}
+            if failed:
+               await tracker.release(*failed)
+
+    async def dispatch(messages, send, *args):
+        # the previous send must be done first: two requests in flight can land in either order
+        await retire(0)
+        inflight.append((messages, asyncio.create_task(send(*args))))
+
+    def posted(result):
+        job['last_sent'] = max(job['last_sent'], sent_id(result))
+        return result
+
+    def details(message):
+        new_caption = custom_caption(message, job['caption'])
+        return {"msg_id": message.id, "media": media(message), "caption": new_caption, 'button': job['button'], "protect": job['protect']}
+
+    async def send_batch(messages):
+        ids = [message.id for message in messages]
+        if job['forward_tag']:
+           posted(await forward(client, ids, progress, sts, job['protect']))
+           return messages
+        try:
+           posted(await copy_batch(client, ids, progress, sts, job['protect']))
+           return messages
+        except RPCError as e:
+           logger.warning(f"Batched copy failed, copying one by one: {e}")
+           return [message for message in messages if posted(await copy(client, details(message), progress, sts))]
+
+    async def send_album(messages):
+        return messages if posted(await copy_album(client, messages, job['caption'], progress, sts, job['protect'])) else []
+
+    async def send_one(message):
+        return [message] if posted(await copy(client, details(message), progress, sts)) else []
+
+    async def flush(ids):
+        messages = [batch.pop(id) for id in ids]
+        del ids[:]
+        await dispatch(messages, send_batch, messages)
+
+    MSG = job['pending'].setdefault(id(client), [])
+    batch = {}
+    previous = None
+    new_chunk = True
+    try:
+      async for item in client.iter_messages(
+        client,
+        chat_id=sts.get('FROM'),
+        limit=int(sts.get('limit')),
+        ranges=ranges,
+        predicate=job['predicate'],
+        group_media=True
+        ):
+            messages = item if isinstance(item, list) else [item]
+            message = messages[0]
+            if temp.CANCEL.get(job['user']) == True:
+               await tracker.cancel()
+               return
+            if message.id in job['delivered']:
+               continue
+            sts.add('fetched', len(messages))
+            sts.set('queued', client.fetch_queue.qsize() if client.fetch_queue else 0)
+            progress.update()
+            if previous is None or message.id != previous + 1:
+               if MSG:
+                  await flush(MSG)
+               new_chunk = True
+            previous = messages[-1].id
+            if message == "DUPLICATE":
+               sts.add('duplicate')
+               await tracker.release(message.id)
+               continue 
+            elif message == "FILTERED":
+               sts.add('filtered')
+               await tracker.release(message.id)
+               continue 
+            if message.empty or message.service:
+               sts.add('deleted')
+               await tracker.release(message.id)
+               continue
+            if new_chunk and job['ordered']:
+               await retire(0)
+               if not await tracker.wait(message.id):
+                  return
+            new_chunk = False
+            if len(messages) > 1:
+               rewrite = not job['forward_tag'] and job['caption'] and custom_caption(message, job['caption']) is not None
+            else:
+               rewrite = not job['forward_tag'] and (job['button'] or (job['caption'] and custom_caption(message, job['caption']) is not None))
+            if not rewrite:
+               if len(MSG) + len(messages) > 100:
+                  await flush(MSG)
+               for message in messages:
+                  MSG.append(message.id)
+                  batch[message.id] = message
+               if len(MSG) >= 100:
+                  await flush(MSG)
+            else:
+               if MSG:
+                  await flush(MSG)
+               if len(messages) > 1:
+                  await dispatch(messages, send_album, messages)
+               else:
+                  await dispatch(messages, send_one, message)
+      if MSG and temp.CANCEL.get(job['user']) != True:
+         await flush(MSG)
+      await retire(0)
+    finally:
+      for message, task in inflight:
+          task.cancel()
             
-async def copy(bot, msg, m, sts):
+async def copy(bot, msg, progress, sts):
+   on_flood = progress.flood
    try:                                  
      if msg.get("media") and msg.get("caption"):
-        await bot.send_cached_media(
+        sent = await limited(bot, sts.get('TO'), bot.send_cached_media,
               chat_id=sts.get('TO'),
               file_id=msg.get("media"),
               caption=msg.get("caption"),
               reply_markup=msg.get('button'),
-              protect_content=msg.get("protect"))
+              protect_content=msg.get("protect"),
+              on_flood=on_flood)
      else:
-        await bot.copy_message(
+        sent = await limited(bot, sts.get('TO'), bot.copy_message,
               chat_id=sts.get('TO'),
               from_chat_id=sts.get('FROM'),    
               caption=msg.get("caption"),
               message_id=msg.get("msg_id"),
               reply_markup=msg.get('button'),
-              protect_content=msg.get("protect"))
-   except FloodWait as e:
-     await edit(m, 'Progressing', e.value, sts)
-     await asyncio.sleep(e.value)
-     await edit(m, 'Progressing', 10, sts)
-     await copy(bot, msg, m, sts)
+              protect_content=msg.get("protect"),
+              on_flood=on_flood)
+     # the sent message, for `sent_id`; True if the API handed none back
+     return sent or True
    except Exception as e:
      print(e)
      sts.add('deleted')
+     return False
         
-async def forward(bot, msg, m, sts, protect):
-   try:                             
-     await bot.forward_messages(
+async def forward(bot, msg, progress, sts, protect):
+   return await limited(bot, sts.get('TO'), bot.forward_messages,
+         chat_id=sts.get('TO'),
+         from_chat_id=sts.get('FROM'), 
+         protect_content=protect,
+         message_ids=msg,
+         on_flood=progress.flood)
+
+async def copy_album(bot, messages, caption, progress, sts, protect):
+   """Send an album as one media group, with the custom caption on its first item"""
+   group = []
+   for n, msg in enumerate(messages):
+     file = getattr(msg, msg.media.value)
+     text = (custom_caption(msg, caption) if n == 0 else None) or (msg.caption.html if msg.caption else '')
+     group.append(ALBUM_TYPES.get(msg.media.value, InputMediaDocument)(file.file_id, caption=text))
+   try:
+     return await limited(bot, sts.get('TO'), bot.send_media_group,
            chat_id=sts.get('TO'),
-           from_chat_id=sts.get('FROM'), 
+           media=group,
            protect_content=protect,
-           message_ids=msg)
-   except FloodWait as e:
-     await edit(m, 'Progressing', e.value, sts)
-     await asyncio.sleep(e.value)
-     await edit(m, 'Progressing', 10, sts)
-     await forward(bot, msg, m, sts, protect)
+           on_flood=progress.flood)
+   except Exception as e:
+     logger.warning(f"Album {messages[0].media_group_id} could not be sent: {e}")
+     sts.add('deleted', len(messages))
+     return False
+
+async def copy_batch(bot, msg, progress, sts, protect):
+   """Copy up to 100 messages in one request: a forward with `drop_author` carries no forward tag"""
+   return await limited(bot, sts.get('TO'), bot.invoke,
+         raw.functions.messages.ForwardMessages(
+            to_peer=await bot.resolve_peer(sts.get('TO')),
+            from_peer=await bot.resolve_peer(sts.get('FROM')),
+            id=msg,
+            random_id=[bot.rnd_id() for _ in msg],
+            drop_author=True,
+            noforwards=protect or None),
+         on_flood=progress.flood)
+
+def sent_id(result):
+   """Highest target message id in what a send returned: a Message, a list of them or raw Updates"""
+   if isinstance(result, list):
+      return max((message.id for message in result), default=0)
+   if isinstance(result, (raw.types.Updates, raw.types.UpdatesCombined)):
+      return max((update.message.id for update in result.updates
+                  if isinstance(update, (raw.types.UpdateNewMessage, raw.types.UpdateNewChannelMessage))), default=0)
+   return getattr(result, 'id', 0) or 0
 
 PROGRESS = """
 📈 Percetage: {0} %
@@ -164,6 +491,8 @@ PROGRESS = """
 ♻️ Stataus: {4}
 
 ⏳️ ETA: {5}
+
+📥 Prefetched: {6}
 """
 
 async def msg_edit(msg, text, button=None, wait=None):
@@ -177,6 +506,9 @@ async def msg_edit(msg, text, button=None, wait=None):
            return await msg_edit(msg, text, button, wait)
         
 async def edit(msg, title, status, sts):
+   await msg_edit(msg, *progress_text(title, status, sts))
+
+def progress_text(title, status, sts):
    i = sts.get(full=True)
    status = 'Forwarding' if status == 10 else f"Sleeping {status} s" if str(status).isnumeric() else status
    percentage = "{:.0f}".format(float(i.fetched)*100/float(i.total))
@@ -202,10 +534,11 @@ async def edit(msg, title, status, sts):
          )
    else:
       button.append([InlineKeyboardButton('• ᴄᴀɴᴄᴇʟ', 'terminate_frwd')])
-   await msg_edit(msg, text, InlineKeyboardMarkup(button))
-   
+   return text, InlineKeyboardMarkup(button)
+
 async def is_cancelled(client, user, msg, sts):
    if temp.CANCEL.get(user)==True:
+      await db.remove_job(sts.id)
       temp.IS_FRWD_CHAT.remove(sts.TO)
       await edit(msg, "Cancelled", "completed", sts)
       await send(client, user, "<b>❌ Forwarding Process Cancelled</b>")
@@ -213,11 +546,13 @@ async def is_cancelled(client, user, msg, sts):
       return True 
    return False 
 
+def unlock(user, sts):
+   temp.lock[user] = False
+   if sts.TO in temp.IS_FRWD_CHAT:
+      temp.IS_FRWD_CHAT.remove(sts.TO)
+
 async def stop(client, user):
-   try:
-     await client.stop()
-   except:
-     pass 
+   await POOL.release(client)
    await db.rmve_frwd(user)
    temp.forwardings -= 1
    temp.lock[user] = False 
@@ -286,13 +621,13 @@ async def status_msg(bot, msg):
     _, status, est_time, percentage, frwd_id = msg.data.split("#")
     sts = STS(frwd_id)
     if not sts.verify():
-       fetched, forwarded, remaining = 0
+       fetched = forwarded = remaining = queued = 0
     else:
-       fetched, forwarded = sts.get('fetched'), sts.get('total_files')
+       fetched, forwarded, queued = sts.get('fetched'), sts.get('total_files'), sts.get('queued')
        remaining = fetched - forwarded 
     est_time = TimeFormatter(milliseconds=est_time)
     est_time = est_time if (est_time != '' or status not in ['completed', 'cancelled']) else '0 s'
-    return await msg.answer(PROGRESS.format(percentage, fetched, forwarded, remaining, status, est_time), show_alert=True)
+    return await msg.answer(PROGRESS.format(percentage, fetched, forwarded, remaining, status, est_time, queued), show_alert=True)
                   
 @Client.on_callback_query(filters.regex(r'^close_btn$'))
 async def close(bot, update):
@@ -0,0 +1,59 @@
+import asyncio
+
+class Sequencer:
+    """Releases message ids in source order across the shards of one forwarding.
+
+    A shard awaits `wait(id)` before sending and calls `release(*ids)` once the
+    ids are sent or skipped; `wait` returns True only when every lower id is
+    released, or False once the forwarding is cancelled. `next - 1` is the last
+    id up to which everything is confirmed, which is what checkpoints store."""
+
+    def __init__(self, start, released=()):
+        self.next = start
+        self.released = set(released)
+        self.cancelled = False
+        self.cond = asyncio.Condition()
+
+    async def wait(self, id):
+        async with self.cond:
+            await self.cond.wait_for(lambda: self.next >= id or self.cancelled)
+            return not self.cancelled
+
+    async def cancel(self):
+        async with self.cond:
+            self.cancelled = True
+            self.cond.notify_all()
+
+    async def release(self, *ids):
+        async with self.cond:
+            # an id below `next` is already confirmed and would never leave the set
+            self.released.update(id for id in ids if id >= self.next)
+            while self.next in self.released:
+                self.released.discard(self.next)
+                self.next += 1
+            self.cond.notify_all()
+
+def plan_shards(start, end, count, chunk=None):
+    """Split the inclusive id range into `count` lists of (first, last) ranges.
+
+    Without `chunk` every shard gets one contiguous slice, otherwise chunks of
+    `chunk` ids are dealt round-robin so shards take turns along the range."""
+    count = max(1, count)
+    total = end - start + 1
+    if total <= 0:
+        return [[] for _ in range(count)]
+    chunk = chunk or -(-total // count)
+    shards = [[] for _ in range(count)]
+    for n, first in enumerate(range(start, end + 1, chunk)):
+        shards[n % count].append((first, min(first + chunk - 1, end)))
+    return shards
+
+def merge_ranges(ids):
+    """Collapse ids into sorted [first, last] ranges of consecutive ids"""
+    ranges = []
+    for id in sorted(ids):
+        if ranges and id == ranges[-1][1] + 1:
+            ranges[-1][1] = id
+        else:
+            ranges.append([id, id])
+    return ranges
@@ -2,7 +2,7 @@ import asyncio
 from database import db
 from translation import Translation
 from pyrogram import Client, filters
-from .test import get_configs, update_configs, CLIENT, parse_buttons
+from .test import get_configs, update_configs, CLIENT, POOL, parse_buttons
 from pyrogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 
 CLIENT = CLIENT()
@@ -28,19 +28,17 @@ async def settings_query(bot, query):
        
   elif type=="bots":
      buttons = [] 
-     _bot = await db.get_bot(user_id)
-     if _bot is not None:
+     for _bot in await db.get_bots(user_id):
         buttons.append([InlineKeyboardButton(_bot['name'],
-                         callback_data=f"settings#editbot")])
-     else:
-        buttons.append([InlineKeyboardButton('✚ Add bot ✚', 
-                         callback_data="settings#addbot")])
-        buttons.append([InlineKeyboardButton('✚ Add User bot ✚', 
-                         callback_data="settings#adduserbot")])
+                         callback_data=f"settings#editbot_{_bot['id']}")])
+     buttons.append([InlineKeyboardButton('✚ Add bot ✚', 
+                      callback_data="settings#addbot")])
+     buttons.append([InlineKeyboardButton('✚ Add User bot ✚', 
+                      callback_data="settings#adduserbot")])
      buttons.append([InlineKeyboardButton('↩ Back', 
                       callback_data="settings#main")])
      await query.message.edit_text(
-       "<b><u>My Bots</b></u>\n\n<b>You can manage your bots in here</b>",
+       "<b><u>My Bots</b></u>\n\n<b>You can manage your bots in here. A forwarding is split across all of them; with Keep order on they take turns, so only one sends at a time</b>",
        reply_markup=InlineKeyboardMarkup(buttons))
   
   elif type=="addbot":
@@ -99,18 +97,22 @@ async def settings_query(bot, query):
      except asyncio.exceptions.TimeoutError:
          await text.edit_text('Process has been automatically cancelled', reply_markup=InlineKeyboardMarkup(buttons))
   
-  elif type=="editbot": 
-     bot = await db.get_bot(user_id)
+  elif type.startswith("editbot"): 
+     bot_id = type.split('_')[1] if '_' in type else None
+     bot = await db.get_bot(user_id, bot_id)
      TEXT = Translation.BOT_DETAILS if bot['is_bot'] else Translation.USER_DETAILS
-     buttons = [[InlineKeyboardButton('❌ Remove ❌', callback_data=f"settings#removebot")
+     buttons = [[InlineKeyboardButton('❌ Remove ❌', callback_data=f"settings#removebot_{bot['id']}")
                ],
                [InlineKeyboardButton('↩ Back', callback_data="settings#bots")]]
      await query.message.edit_text(
         TEXT.format(bot['name'], bot['id'], bot['username']),
         reply_markup=InlineKeyboardMarkup(buttons))
                                              
-  elif type=="removebot":
-     await db.remove_bot(user_id)
+  elif type.startswith("removebot"):
+     bot_id = type.split('_')[1] if '_' in type else None
+     await db.remove_bot(user_id, bot_id)
+     if bot_id:
+        await POOL.discard(bot_id)
      await query.message.edit_text(
         "<b>successfully updated</b>",
         reply_markup=InlineKeyboardMarkup(buttons))
@@ -295,7 +297,7 @@ async def settings_query(bot, query):
         await update_configs(user_id, key, False)
      else:
         await update_configs(user_id, key, True)
-     if key in ['poll', 'protect']:
+     if key in ['poll', 'protect', 'ordered']:
         return await query.edit_message_reply_markup(
            reply_markup=await next_filters_buttons(user_id)) 
      await query.edit_message_reply_markup(
@@ -557,6 +559,11 @@ async def next_filters_buttons(user_id):
        InlineKeyboardButton('✅' if filter['protect'] else '❌',
                     callback_data=f'settings#updatefilter-protect-{filter["protect"]}')
        ],[
+       InlineKeyboardButton('🔢 Keep order',
+                    callback_data=f'settings_#updatefilter-ordered-{filter.get("ordered", False)}'),
+       InlineKeyboardButton('✅' if filter.get('ordered', False) else '❌',
+                    callback_data=f'settings#updatefilter-ordered-{filter.get("ordered", False)}')
+       ],[
        InlineKeyboardButton('🛑 size limit',
                     callback_data='settings#file_size')
        ],[
@@ -1,6 +1,7 @@
 import os
 import re 
 import sys
+import time
 import typing
 import asyncio 
 import logging 
@@ -33,6 +34,9 @@ async def start_clone_bot(FwdBot, data=None):
       offset: int = 0,
       search: str = None,
       filter: "types.TypeMessagesFilter" = None,
+      predicate: typing.Callable = None,
+      ranges: list = None,
+      group_media: bool = False,
       ) -> Optional[AsyncGenerator["types.Message", None]]:
         """Iterate through a chat sequentially.
         This convenience method does the same as repeatedly calling :meth:`~pyrogram.Client.get_messages` in a loop, thus saving
@@ -50,6 +54,20 @@ async def start_clone_bot(FwdBot, data=None):
             offset (``int``, *optional*):
                 Identifier of the first message to be returned.
                 Defaults to 0.
+
+            predicate (``Callable``, *optional*):
+                Coroutine applied to every fetched window right after it arrives; may replace
+                messages with "FILTERED" / "DUPLICATE" sentinels.
+
+            ranges (``list``, *optional*):
+                Inclusive ``(first, last)`` id ranges to iterate instead of ``offset`` .. ``limit``.
+
+            group_media (``bool``, *optional*):
+                Yield consecutive messages sharing a ``media_group_id`` together as one list.
+
+        Up to ``Config.PREFETCH_WINDOWS`` windows of 200 ids are fetched concurrently ahead of the
+        consumer through a bounded queue, so fetch latency overlaps with forwarding. The queue is
+        exposed as ``self.fetch_queue`` while iterating.
         Returns:
             ``Generator``: A generator yielding :obj:`~pyrogram.types.Message` objects.
         Example:
@@ -57,17 +75,54 @@ async def start_clone_bot(FwdBot, data=None):
                 for message in app.iter_messages("pyrogram", 1, 15000):
                     print(message.text)
         """
-        current = offset
-        while True:
-            new_diff = min(200, limit - current)
-            if new_diff <= 0:
-                return
-            messages = await self.get_messages(chat_id, list(range(current, current+new_diff+1)))
-            for message in messages:
-                yield message
-                current += 1
+        queue = asyncio.Queue(maxsize=max(1, Config.PREFETCH_WINDOWS))
+        self.fetch_queue = queue
+
+        async def fetch(ids):
+            while True:
+                try:
+                    messages = await self.get_messages(chat_id, ids)
+                    return await predicate(messages) if predicate else messages
+                except FloodWait as e:
+                    await asyncio.sleep(e.value)
+
+        async def producer():
+            for first, last in ranges if ranges is not None else [(offset, limit)]:
+                current = first
+                while current <= last:
+                    ids = list(range(current, min(current + 200, last + 1)))
+                    await queue.put(asyncio.create_task(fetch(ids)))
+                    current += len(ids)
+            await queue.put(None)
+
+        feeder = asyncio.create_task(producer())
+        album = []
+        try:
+            while True:
+                window = await queue.get()
+                if window is None:
+                    break
+                for message in await window:
+                    group = group_media and not isinstance(message, str) and not message.empty and message.media_group_id
+                    if album and group != album[0].media_group_id:
+                        yield album if len(album) > 1 else album[0]
+                        album = []
+                    if group:
+                        album.append(message)
+                    else:
+                        yield message
+            if album:
+                yield album if len(album) > 1 else album[0]
+        finally:
+            feeder.cancel()
+            while not queue.empty():
+                window = queue.get_nowait()
+                if window is not None:
+                    window.cancel()
+            self.fetch_queue = None
    #
    FwdBot.iter_messages = iter_messages
+   FwdBot.fetch_queue = None
    return FwdBot
 
 class CLIENT: 
@@ -137,7 +192,111 @@ class CLIENT:
      }
      await db.add_bot(details)
      return True
-    
+
+class ClientPool:
+  """Process-wide pool of started bot / userbot clients keyed by bot id.
+
+  `lease` hands out a running client (starting one only when none is pooled or the
+  pooled one fails its health check) and `release` gives it back. Clients idle for
+  `Config.CLIENT_IDLE_TIMEOUT` seconds are stopped, and past `Config.CLIENT_POOL_SIZE`
+  the least recently used idle ones go first."""
+
+  def __init__(self):
+     self.entries = {}
+     self.retired = {}
+     self.locks = {}
+     self.reaper = None
+
+  @staticmethod
+  def credential(data):
+     return data.get('token') or data.get('session')
+
+  async def lease(self, data):
+     bot_id = int(data['id'])
+     async with self.locks.setdefault(bot_id, asyncio.Lock()):
+        entry = self.entries.get(bot_id)
+        if entry and (entry['credential'] != self.credential(data) or not await self.healthy(entry)):
+           await self.discard(bot_id)
+           entry = None
+        if not entry:
+           client = await start_clone_bot(CLIENT().client(data))
+           entry = self.entries[bot_id] = {'client': client, 'credential': self.credential(data), 'leases': 0, 'used': 0}
+        entry['leases'] += 1
+        entry['used'] = time.monotonic()
+     if not self.reaper or self.reaper.done():
+        self.reaper = asyncio.create_task(self.reap())
+     await self.shrink()
+     return entry['client']
+
+  async def release(self, client):
+     for bot_id, entry in self.entries.items():
+        if entry['client'] is client:
+           entry['leases'] = max(0, entry['leases'] - 1)
+           entry['used'] = time.monotonic()
+           break
+     else:
+        # discarded while leased: stop it once the last lease comes back
+        entry = self.retired.get(id(client))
+        if entry:
+           entry['leases'] -= 1
+        if not entry or entry['leases'] <= 0:
+           self.retired.pop(id(client), None)
+           await self.stop_client(client)
+     await self.shrink()
+
+  async def healthy(self, entry):
+     client = entry['client']
+     if not client.is_connected:
+        return False
+     if entry['leases'] or time.monotonic() - entry['used'] < Config.CLIENT_HEALTH_INTERVAL:
+        return True
+     try:
+        await asyncio.wait_for(client.get_me(), 15)
+        return True
+     except Exception as e:
+        logger.warning(f"Pooled client {client.me.id if client.me else ''} failed health check: {e}")
+        return False
+
+  async def discard(self, bot_id):
+     """Drop a pooled client, e.g. when its bot is removed; in-flight leases keep working until released"""
+     entry = self.entries.pop(int(bot_id), None)
+     if not entry:
+        return
+     if entry['leases']:
+        self.retired[id(entry['client'])] = entry
+     else:
+        await self.stop_client(entry['client'])
+
+  async def shrink(self):
+     idle = sorted((entry['used'], bot_id) for bot_id, entry in self.entries.items() if not entry['leases'])
+     excess = len(self.entries) - max(0, Config.CLIENT_POOL_SIZE)
+     for used, bot_id in idle[:max(0, excess)]:
+        await self.discard(bot_id)
+
+  async def reap(self):
+     while self.entries:
+        await asyncio.sleep(60)
+        now = time.monotonic()
+        for bot_id, entry in list(self.entries.items()):
+           if not entry['leases'] and now - entry['used'] > Config.CLIENT_IDLE_TIMEOUT:
+              await self.discard(bot_id)
+
+  async def close(self):
+     if self.reaper:
+        self.reaper.cancel()
+     for bot_id in list(self.entries):
+        entry = self.entries.pop(bot_id)
+        await self.stop_client(entry['client'])
+
+  @staticmethod
+  async def stop_client(client):
+     try:
+        await client.stop()
+     except Exception:
+        pass
+
+POOL = ClientPool()
+
 @Client.on_message(filters.private & filters.command('reset'))
 async def forward_tag(bot, m):
    default = await db.get_configs("01")
@@ -178,7 +337,7 @@ async def get_configs(user_id):
                           
 async def update_configs(user_id, key, value):
   current = await db.get_configs(user_id)
-  if key in ['caption', 'duplicate', 'db_uri', 'forward_tag', 'protect', 'file_size', 'size_limit', 'extension', 'keywords', 'button']:
+  if key in ['caption', 'duplicate', 'db_uri', 'forward_tag', 'protect', 'file_size', 'size_limit', 'extension', 'keywords', 'button', 'ordered']:
      current[key] = value
   else: 
      current['filters'][key] = value
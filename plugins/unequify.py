@@ -1,13 +1,15 @@
 import re, asyncio
 from database import db
 from config import temp
-from .test import CLIENT , start_clone_bot
+from .test import POOL
+from .ratelimit import limited
+from .dedup import ChatFileIndex
+from .utils import ProgressReporter
 from translation import Translation
-from pyrogram import Client, filters 
+from pyrogram import Client, filters, enums
 #from pyropatch.utils import unpack_new_file_id
 from pyrogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 
-CLIENT = CLIENT()
 COMPLETED_BTN = InlineKeyboardMarkup(
    [
       [InlineKeyboardButton('⚡ Support', url='https://t.me/dev_gagan')],
@@ -17,14 +19,23 @@ COMPLETED_BTN = InlineKeyboardMarkup(
 
 CANCEL_BTN = InlineKeyboardMarkup([[InlineKeyboardButton('• ᴄᴀɴᴄᴇʟ', 'terminate_frwd')]])
 
+# searched concurrently, a file_unique_id never repeats across them
+MEDIA_FILTERS = [
+   enums.MessagesFilter.DOCUMENT,
+   enums.MessagesFilter.VIDEO,
+   enums.MessagesFilter.AUDIO,
+   enums.MessagesFilter.PHOTO,
+   enums.MessagesFilter.ANIMATION
+]
+
 @Client.on_message(filters.command("unequify") & filters.private)
 async def unequify(client, message):
    user_id = message.from_user.id
    temp.CANCEL[user_id] = False
    if temp.lock.get(user_id) and str(temp.lock.get(user_id))=="True":
       return await message.reply("**please wait until previous task complete**")
-   _bot = await db.get_bot(user_id)
-   if not _bot or _bot['is_bot']:
+   _bot = await db.get_bot(user_id, is_bot=False)
+   if not _bot:
       return await message.reply("<b>Need userbot to do this process. Please add a userbot using /settings</b>")
    target = await client.ask(user_id, text="**Forward the last message from target chat or send last message link.**\n/cancel - `cancel this process`")
    if target.text.startswith("/"):
@@ -38,7 +49,7 @@ async def unequify(client, message):
       last_msg_id = int(match.group(5))
       if chat_id.isnumeric():
          chat_id  = int(("-100" + chat_id))
-   elif fromid.forward_from_chat.type in ['channel', 'supergroup']:
+   elif target.forward_from_chat.type in ['channel', 'supergroup']:
         last_msg_id = target.forward_from_message_id
         chat_id = target.forward_from_chat.username or target.forward_from_chat.id
    else:
@@ -48,7 +59,7 @@ async def unequify(client, message):
       return await confirm.reply("**process cancelled !**")
    sts = await confirm.reply("`processing..`")
    try:
-      bot = await start_clone_bot(CLIENT.client(_bot))
+      bot = await POOL.lease(_bot)
    except Exception as e:
       return await sts.edit(e)
    try:
@@ -56,39 +67,90 @@ async def unequify(client, message):
        await k.delete()
    except:
        await sts.edit(f"**please make your [userbot](t.me/{_bot['username']}) admin in target chat with full permissions**")
-       return await bot.stop()
-   MESSAGES = []
+       return await POOL.release(bot)
+   chat_id = k.chat.id
+   index = await ChatFileIndex(chat_id).load()
    DUPLICATE = []
-   total=deleted=0
+   deletions = asyncio.Queue()
+   stats = {'total': 0, 'deleted': 0, 'scanned': index.scanned}
+   progress = ProgressReporter(sts, lambda sleeping: (
+      Translation.DUPLICATE_TEXT.format(stats['total'], stats['deleted'], f"sʟᴇᴇᴘɪɴɢ {sleeping}s" if sleeping else "ᴘʀᴏɢʀᴇssɪɴɢ"),
+      CANCEL_BTN))
    temp.lock[user_id] = True
+
+   async def deleter():
+      # deletes run beside the scan instead of pausing it every 100 duplicates
+      while (ids := await deletions.get()) is not None:
+         await limited(bot, chat_id, bot.delete_messages, chat_id, ids, on_flood=progress.flood)
+         stats['deleted'] += len(ids)
+         progress.update()
+
+   async def check(messages):
+      items = [(getattr(message, message.media.value).file_unique_id, message.id) for message in messages]
+      stored = await index.lookup({key for key, id in items if index.seen.get(key) is None})
+      # copies kept by earlier runs are older than anything scanned now; only keep them if still there
+      alive = set()
+      if stored:
+         found = await limited(bot, chat_id, bot.get_messages, chat_id, list(set(stored.values())))
+         alive = {message.id for message in (found if isinstance(found, list) else [found]) if not message.empty}
+      for key, id in items:
+         kept = index.seen.get(key)
+         if kept is None and stored.get(key) in alive:
+            kept = stored[key]
+            index.seen.put(key, kept)
+         if kept is None:
+            await index.keep(key, id)
+         elif kept != id:
+            if id < kept:
+               await index.keep(key, id)
+            DUPLICATE.append(max(kept, id))
+      stats['total'] += len(items)
+      stats['scanned'] = max(stats['scanned'], max(id for key, id in items))
+      progress.update()
+      while len(DUPLICATE) >= 100:
+         deletions.put_nowait(DUPLICATE[:100])
+         del DUPLICATE[:100]
+      if deleting.done():
+         # surface a failed delete instead of scanning on
+         await deleting
+
+   async def scan(filter):
+      batch = []
+      async for message in bot.search_messages(chat_id=chat_id, filter=filter):
+         if temp.CANCEL.get(user_id) == True or message.id <= index.scanned:
+            break
+         batch.append(message)
+         if len(batch) >= 200:
+            await check(batch)
+            batch = []
+      if batch:
+         await check(batch)
+
+   progress.start()
+   deleting = asyncio.create_task(deleter())
    try:
-     await sts.edit(Translation.DUPLICATE_TEXT.format(total, deleted, "ᴘʀᴏɢʀᴇssɪɴɢ"), reply_markup=CANCEL_BTN)
-     async for message in bot.search_messages(chat_id=chat_id, filter="document"):
-        if temp.CANCEL.get(user_id) == True:
-           await sts.edit(Translation.DUPLICATE_TEXT.format(total, deleted, "ᴄᴀɴᴄᴇʟʟᴇᴅ"), reply_markup=COMPLETED_BTN)
-           return await bot.stop()
-        file = message.document
-        file_id = unpack_new_file_id(file.file_id) 
-        if file_id in MESSAGES:
-           DUPLICATE.append(message.id)
-        else:
-           MESSAGES.append(file_id)
-        total += 1
-        if total %10000 == 0:
-           await sts.edit(Translation.DUPLICATE_TEXT.format(total, deleted, "ᴘʀᴏɢʀᴇssɪɴɢ"), reply_markup=CANCEL_BTN)
-        if len(DUPLICATE) >= 100:
-           await bot.delete_messages(chat_id, DUPLICATE)
-           deleted += 100
-           await sts.edit(Translation.DUPLICATE_TEXT.format(total, deleted, "ᴘʀᴏɢʀᴇssɪɴɢ"), reply_markup=CANCEL_BTN)
-           DUPLICATE = []
+     await asyncio.gather(*(scan(filter) for filter in MEDIA_FILTERS))
+     if temp.CANCEL.get(user_id) == True:
+        deleting.cancel()
+        await index.flush()
+        await progress.stop()
+        temp.lock[user_id] = False
+        await sts.edit(Translation.DUPLICATE_TEXT.format(stats['total'], stats['deleted'], "ᴄᴀɴᴄᴇʟʟᴇᴅ"), reply_markup=COMPLETED_BTN)
+        return await POOL.release(bot)
      if DUPLICATE:
-        await bot.delete_messages(chat_id, DUPLICATE)
-        deleted += len(DUPLICATE)
+        deletions.put_nowait(DUPLICATE)
+     deletions.put_nowait(None)
+     await deleting
+     await index.save(stats['scanned'])
    except Exception as e:
+       deleting.cancel()
+       await progress.stop()
        temp.lock[user_id] = False 
        await sts.edit(f"**ERROR**\n`{e}`")
-       return await bot.stop()
+       return await POOL.release(bot)
+   finally:
+       index.close()
+   await progress.stop()
    temp.lock[user_id] = False
-   await sts.edit(Translation.DUPLICATE_TEXT.format(total, deleted, "ᴄᴏᴍᴘʟᴇᴛᴇᴅ"), reply_markup=COMPLETED_BTN)
-   await bot.stop()
-   
+   await sts.edit(Translation.DUPLICATE_TEXT.format(stats['total'], stats['deleted'], "ᴄᴏᴍᴘʟᴇᴛᴇᴅ"), reply_markup=COMPLETED_BTN)
+   await POOL.release(bot)
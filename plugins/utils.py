@@ -1,6 +1,13 @@
+import math
+import asyncio
+import logging
 import time as tm
 from database import db 
+from config import Config
 from .test import parse_buttons
+from pyrogram.errors import FloodWait, MessageNotModified
+
+logger = logging.getLogger(__name__)
 
 STATUS = {}
 
@@ -14,7 +21,7 @@ class STS:
     
     def store(self, From, to,  skip, limit):
         self.data[self.id] = {"FROM": From, 'TO': to, 'total_files': 0, 'skip': skip, 'limit': limit,
-                      'fetched': skip, 'filtered': 0, 'deleted': 0, 'duplicate': 0, 'total': limit, 'start': 0}
+                      'fetched': skip, 'filtered': 0, 'deleted': 0, 'duplicate': 0, 'total': limit, 'start': 0, 'queued': 0}
         self.get(full=True)
         return STS(self.id)
         
@@ -31,6 +38,9 @@ class STS:
           return self.data[self.id].update({'start': tm.time()})
         self.data[self.id].update({key: self.get(key) + value}) 
     
+    def set(self, key, value):
+        self.data[self.id].update({key: value})
+    
     def divide(self, no, by):
        by = 1 if int(by) == 0 else by 
        return int(no) / by 
@@ -47,5 +57,59 @@ class STS:
         if configs['file_size'] != 0:
             size = [configs['file_size'], configs['size_limit']]
         return bot, configs['caption'], configs['forward_tag'], {'chat_id': k.FROM, 'limit': k.limit, 'offset': k.skip, 'filters': filters,
-                'keywords': configs['keywords'], 'media_size': size, 'extensions': configs['extension'], 'skip_duplicate': duplicate}, configs['protect'], button
-        
\ No newline at end of file
+                'keywords': configs['keywords'], 'media_size': size, 'extensions': configs['extension'], 'skip_duplicate': duplicate, 'ordered': configs.get('ordered', False)}, configs['protect'], button
+        
+
+class ProgressReporter:
+    """Edits a status message from its own task.
+
+    `update()` only marks the status dirty, so the worker never awaits an edit; the
+    task calls `render(sleeping)` for the (text, markup) at most once per
+    `Config.PROGRESS_INTERVAL` seconds and skips the edit when the text did not
+    change. `sleeping` is the seconds left of a FloodWait reported through `flood`."""
+
+    def __init__(self, msg, render):
+        self.msg = msg
+        self.render = render
+        self.dirty = asyncio.Event()
+        self.sleeping_until = 0
+        self.text = None
+        self.task = None
+
+    def start(self):
+        self.task = asyncio.create_task(self.run())
+        self.update()
+
+    def update(self):
+        self.dirty.set()
+
+    async def flood(self, seconds):
+        self.sleeping_until = max(self.sleeping_until, tm.time() + seconds)
+        self.update()
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+
+    async def run(self):
+        while True:
+            await self.dirty.wait()
+            self.dirty.clear()
+            sleeping = max(0, math.ceil(self.sleeping_until - tm.time()))
+            text, button = self.render(sleeping)
+            if text != self.text:
+                try:
+                    await self.msg.edit(text, reply_markup=button)
+                    self.text = text
+                except MessageNotModified:
+                    self.text = text
+                except FloodWait as e:
+                    self.update()
+                    await asyncio.sleep(e.value)
+                except Exception as e:
+                    logger.warning(f"Status edit failed: {e}")
+            if sleeping:
+                # flip the status back once the sleep is over
+                asyncio.get_running_loop().call_later(sleeping, self.update)
+            await asyncio.sleep(Config.PROGRESS_INTERVAL)
@@ -124,10 +124,12 @@ class Translation(object):
 <b>📤 Step 4:</b> Posts the converted result to your target channel
 
 <b><u>Available Commands:</u></b>
-<b>• /chain</b> - Set up chain forwarding
-<b>• /chainlist</b> - View current configuration  
+<b>• /chain</b> - Set up a chain (one per source channel, any number of targets)
+<b>• /chainlist</b> - View your chains  
+<b>• /chaindomains</b> - Set the link domains to convert
 <b>• /chainon</b> - Enable chain forwarding
 <b>• /chainoff</b> - Disable chain forwarding
+<b>• /chaindel</b> - Delete a chain
 
 <b><u>Requirements:</u></b>
 <b>• Your bot must be admin in target channel</b>
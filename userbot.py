@@ -6,6 +6,7 @@ from pyrogram import Client, filters, enums
 from pyrogram.errors import FloodWait, SessionPasswordNeeded, PhoneCodeInvalid, PhoneNumberInvalid
 from config import Config, temp
 from database import db
+from plugins.chain_forward import load_chain_index, load_chain_operations
 from rich.console import Console
 from rich.prompt import Prompt
 from rich.panel import Panel
@@ -49,6 +50,9 @@ class UserBot:
             ))
             
             temp.USER_CLIENT = self.client
+            chains = await load_chain_index()
+            pending = await load_chain_operations()
+            console.print(f"[cyan]🔗 Monitoring {chains} active chain(s), {pending} conversion(s) pending[/cyan]")
             return self.client
             
         except SessionPasswordNeeded: